@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, has_request_context
 from flask_cors import CORS
 import mysql.connector
 from mysql.connector import Error
@@ -9,6 +9,9 @@ from datetime import datetime as dt
 from functools import wraps
 import os
 import json
+import re
+import time
+import random
 import logging
 from logging.handlers import RotatingFileHandler
 
@@ -50,6 +53,29 @@ DB_CONFIG = {
     'charset': 'utf8mb4'
 }
 
+# Read replica'lar - "host:port" virgülle ayrılmış (ör. DB_REPLICA_HOSTS=127.0.0.1:3307,127.0.0.1:3308)
+REPLICA_CONFIGS = []
+for replica in filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    REPLICA_CONFIGS.append({**DB_CONFIG, 'host': replica_host, 'port': int(replica_port or 3306)})
+
+# Endpoint bazında kabul edilen maksimum replica gecikmesi (saniye)
+REPLICA_MAX_STALENESS = {
+    'default': 5,
+    'get_stats': 60,
+    'get_logs': 10,
+    'get_log_stats': 60
+}
+
+REPLICA_LAG_CHECK_INTERVAL = int(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))  # saniye
+READ_YOUR_WRITES_WINDOW = int(os.getenv('READ_YOUR_WRITES_WINDOW', 30))  # yazma sonrası primary'den okuma süresi
+
+# Replica gecikme önbelleği: 'host:port' -> {'lag': saniye (None = kullanılamaz), 'checked_at': zaman}
+REPLICA_LAG = {}
+
+# Son yazma zamanları: api_key -> zaman (read-your-writes için)
+LAST_WRITE_AT = {}
+
 # API Keys - Gerçek uygulamada veritabanında saklanmalı
 API_KEYS = {
     'demo_key_123': {
@@ -68,15 +94,119 @@ API_KEYS = {
     }
 }
 
-# Database bağlantısı
-def get_db_connection():
+# Endpoint bazında sorgu süre bütçeleri (ms) - PUT /api/admin/query-budgets ile değiştirilebilir
+QUERY_BUDGETS = {
+    'default': int(os.getenv('QUERY_BUDGET_DEFAULT_MS', 5000)),
+    'get_accounts': 5000,
+    'get_account': 1000,
+    'search_accounts': 8000,
+    'get_stats': 10000,
+    'get_logs': 5000,
+    'get_log_stats': 10000
+}
+
+# Bütçeyi aşan sorgu sayaçları (endpoint -> adet)
+QUERY_TIMEOUT_COUNTERS = {}
+
+# MySQL: 3024 = ER_QUERY_TIMEOUT (MAX_EXECUTION_TIME aşıldı), 1317 = ER_QUERY_INTERRUPTED
+QUERY_TIMEOUT_ERRNOS = (3024, 1317)
+
+def get_query_budget(endpoint=None):
+    if endpoint is None and has_request_context():
+        endpoint = request.endpoint
+    return QUERY_BUDGETS.get(endpoint, QUERY_BUDGETS['default'])
+
+# Replica gecikmesini ölç (REPLICA_LAG_CHECK_INTERVAL boyunca önbellekte tutulur)
+def get_replica_lag(replica):
+    key = f"{replica['host']}:{replica['port']}"
+    cached = REPLICA_LAG.get(key)
+    now = time.time()
+    if cached and now - cached['checked_at'] < REPLICA_LAG_CHECK_INTERVAL:
+        return cached['lag']
+    
+    lag = None
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = mysql.connector.connect(**replica, connection_timeout=2)
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            status = cursor.fetchone()
+            lag = status['Seconds_Behind_Source'] if status else None
+        except Error:
+            # MySQL 8.0.22 öncesi
+            cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+            lag = status['Seconds_Behind_Master'] if status else None
+        connection.close()
+    except Error as e:
+        app.logger.warning(f"Replica gecikme kontrolü başarısız ({key}): {e}")
+    
+    REPLICA_LAG[key] = {'lag': lag, 'checked_at': now}
+    return lag
+
+# Bu istemci yakın zamanda yazma yaptı mı?
+def has_recent_write():
+    if not has_request_context():
+        return False
+    api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
+    last_write = LAST_WRITE_AT.get(api_key)
+    return last_write is not None and time.time() - last_write < READ_YOUR_WRITES_WINDOW
+
+# Yazma sonrası istemcinin okumalarını primary'ye sabitle
+def mark_write():
+    api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
+    if api_key:
+        LAST_WRITE_AT[api_key] = time.time()
+
+# Okuma için bağlantı ayarlarını seç - gecikmesi endpoint limitinde olan bir replica, yoksa primary
+def choose_read_config(endpoint=None):
+    if not REPLICA_CONFIGS or has_recent_write():
+        return DB_CONFIG
+    
+    if endpoint is None and has_request_context():
+        endpoint = request.endpoint
+    max_staleness = REPLICA_MAX_STALENESS.get(endpoint, REPLICA_MAX_STALENESS['default'])
+    
+    candidates = []
+    for replica in REPLICA_CONFIGS:
+        lag = get_replica_lag(replica)
+        if lag is not None and lag <= max_staleness:
+            candidates.append(replica)
+    
+    return random.choice(candidates) if candidates else DB_CONFIG
+
+# Database bağlantısı - endpoint bütçesi oturum seviyesinde MAX_EXECUTION_TIME olarak uygulanır
+# read_only=True olan bağlantılar uygun bir replica'ya yönlendirilir
+def get_db_connection(endpoint=None, read_only=False):
+    config = choose_read_config(endpoint) if read_only else DB_CONFIG
+    try:
+        connection = mysql.connector.connect(**config)
+        cursor = connection.cursor()
+        cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (get_query_budget(endpoint),))
+        cursor.close()
         return connection
     except Error as e:
-        app.logger.error(f"Database bağlantı hatası: {e}")
+        app.logger.error(f"Database bağlantı hatası ({config['host']}): {e}")
+        if config is not DB_CONFIG:
+            # Başarısızlık kontrol aralığı boyunca önbellekte kalır; ölü replica her okumada
+            # bağlantı zaman aşımını yeniden beklemez
+            REPLICA_LAG[f"{config['host']}:{config['port']}"] = {'lag': None, 'checked_at': time.time()}
+            return get_db_connection(endpoint)
         return None
 
+# Database hata yanıtı - bütçe aşımları 503 olarak döner ve sayılır
+def database_error_response(e):
+    if getattr(e, 'errno', None) in QUERY_TIMEOUT_ERRNOS:
+        endpoint = request.endpoint or 'unknown'
+        QUERY_TIMEOUT_COUNTERS[endpoint] = QUERY_TIMEOUT_COUNTERS.get(endpoint, 0) + 1
+        app.logger.warning(f"Sorgu bütçesi aşıldı: {endpoint} ({get_query_budget()} ms)")
+        return jsonify({
+            'error': 'Sorgu zaman aşımı',
+            'message': 'Sorgu süre bütçesini aştı, lütfen filtreleri daraltıp tekrar deneyin',
+            'timeout_ms': get_query_budget()
+        }), 503
+    return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+
 # İstek logları için database tablosu oluştur
 def create_logs_table():
     try:
@@ -113,6 +243,56 @@ def create_logs_table():
 # Başlangıçta logs tablosunu oluştur
 create_logs_table()
 
+# Yaklaşık top-K için space-saving sketch - her sayaç [count, error]
+# count gerçek değerin üst sınırı, count - error alt sınırıdır
+# Sketch'leri data/rollup.py tüm accs üzerinden besler, API yalnızca okur
+class SpaceSavingSketch:
+    def __init__(self, capacity, counters=None):
+        self.capacity = capacity
+        self.counters = counters or {}
+    
+    def top(self, k):
+        ranked = sorted(self.counters.items(), key=lambda entry: entry[1][0], reverse=True)
+        threshold = ranked[k][1][0] if len(ranked) > k else 0
+        return [
+            {
+                'item': item,
+                'count': count,
+                'error': error,
+                'count_lower_bound': count - error,
+                'guaranteed': count - error >= threshold
+            }
+            for item, (count, error) in ranked[:k]
+        ]
+
+# Sketch'lerin stream_sketches'ten yeniden okunma aralığı (saniye)
+TOPK_RELOAD_INTERVAL = int(os.getenv('TOPK_RELOAD_INTERVAL', 60))
+
+# Alan adı -> sketch; yoksa get_stats tam SQL yoluna düşer
+TOPK_SKETCHES = {}
+TOPK_LOADED_AT = 0
+
+# Sketch'leri gerekirse stream_sketches'ten yeniden yükle
+def refresh_topk_sketches(cursor):
+    global TOPK_SKETCHES, TOPK_LOADED_AT
+    if time.time() - TOPK_LOADED_AT < TOPK_RELOAD_INTERVAL:
+        return
+    TOPK_LOADED_AT = time.time()
+    try:
+        sketches = {}
+        for field in ['domain', 'region']:
+            cursor.execute("SELECT capacity, state FROM stream_sketches WHERE name = %s", (f"topk_{field}",))
+            row = cursor.fetchone()
+            if not row:
+                sketches = {}
+                break
+            sketches[field] = SpaceSavingSketch(row['capacity'], json.loads(row['state']))
+        # Tek atamayla değiştirilir; okuyan istekler yarım yüklenmiş hali görmez
+        TOPK_SKETCHES = sketches
+    except Error as e:
+        TOPK_SKETCHES = {}
+        app.logger.error(f"Top-K sketch yükleme hatası: {e}")
+
 # İstek loglama decorator'ı
 def log_request(f):
     @wraps(f)
@@ -290,9 +470,11 @@ def index():
                 'PUT /api/accounts/{id}': 'Hesap güncelle (write izni gerekli)',
                 'DELETE /api/accounts/{id}': 'Hesap sil (write izni gerekli)',
                 'GET /api/search': 'Hesap ara',
-                'GET /api/stats': 'İstatistikler',
+                'GET /api/advisories': 'Zafiyet bildirimleri (?cve=CVE-2024-1234 veya ?vendor=x&product=y)',
+                'GET /api/stats': 'İstatistikler (?exact=1 ile tam top-K)',
                 'POST /api/accounts/bulk': 'Toplu hesap ekleme (write izni gerekli)',
-                'GET /api/key-info': 'API key bilgileri'
+                'GET /api/key-info': 'API key bilgileri',
+                'GET|PUT /api/admin/query-budgets': 'Sorgu süre bütçeleri (write izni gerekli)'
             }
         },
         'example_usage': {
@@ -419,7 +601,7 @@ def get_accounts():
         })
         
     except Error as e:
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
 
 # Tek hesap getir
 @app.route('/api/accounts/<int:account_id>', methods=['GET'])
@@ -448,7 +630,7 @@ def get_account(account_id):
             }), 404
             
     except Error as e:
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
 
 # Yeni hesap ekle
 @app.route('/api/accounts', methods=['POST'])
@@ -492,6 +674,7 @@ def create_account():
         
         cursor.execute(insert_query, values)
         connection.commit()
+        mark_write()
         
         new_id = cursor.lastrowid
         connection.close()
@@ -507,7 +690,7 @@ def create_account():
         }), 201
         
     except Error as e:
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
 
 # Hesap güncelle
 @app.route('/api/accounts/<int:account_id>', methods=['PUT'])
@@ -551,6 +734,7 @@ def update_account(account_id):
         
         cursor.execute(update_query, values)
         connection.commit()
+        mark_write()
         connection.close()
         
         return jsonify({
@@ -559,7 +743,7 @@ def update_account(account_id):
         })
         
     except Error as e:
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
 
 # Hesap sil
 @app.route('/api/accounts/<int:account_id>', methods=['DELETE'])
@@ -582,6 +766,7 @@ def delete_account(account_id):
         
         cursor.execute("DELETE FROM accs WHERE id = %s", (account_id,))
         connection.commit()
+        mark_write()
         connection.close()
         
         return jsonify({
@@ -590,7 +775,7 @@ def delete_account(account_id):
         })
         
     except Error as e:
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
 
 # Arama
 @app.route('/api/search', methods=['GET'])
@@ -640,42 +825,166 @@ def search_accounts():
         })
         
     except Error as e:
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
+
+# Zafiyet bildirimlerini CVE / üretici / ürün ile bul (telegram-adp yan tabloları üzerinden index seek)
+CVE_ID_PATTERN = re.compile(r'^CVE-\d{4}-\d{4,7}$')
+
+@app.route('/api/advisories', methods=['GET'])
+@log_request
+@api_key_required(['read'])
+def get_advisories():
+    try:
+        cve = request.args.get('cve', '').strip().upper()
+        vendor = request.args.get('vendor', '').strip().lower()
+        product = request.args.get('product', '').strip().lower()
+        limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+
+        if not (cve or vendor or product):
+            return jsonify({'error': 'cve, vendor veya product parametrelerinden biri gerekli'}), 400
+        if cve and not CVE_ID_PATTERN.match(cve):
+            return jsonify({'error': 'Geçersiz CVE formatı (örnek: CVE-2024-12345)'}), 400
+
+        columns = """
+            v.id, v.channel, v.source, v.title, v.content, v.detection_date, v.type
+        """
+        if cve:
+            query = f"""
+                SELECT {columns}, c.cvss_score
+                FROM vulnerability_cves c
+                JOIN vulnerabilities v ON v.id = c.vulnerability_id
+                WHERE c.cve_id = %s
+                ORDER BY v.detection_date DESC, v.id DESC
+                LIMIT %s
+            """
+            params = (cve, limit)
+        else:
+            conditions = []
+            params = []
+            if vendor:
+                conditions.append("p.vendor = %s")
+                params.append(vendor)
+            if product:
+                conditions.append("p.product = %s")
+                params.append(product)
+            # Tekilleştirme yan tablonun id'leri üzerinde yapılır; TEXT kolonlar üzerinde
+            # DISTINCT geçici tabloda sıralama gerektirirdi
+            query = f"""
+                SELECT {columns}
+                FROM (
+                    SELECT DISTINCT p.vulnerability_id
+                    FROM vulnerability_products p
+                    WHERE {' AND '.join(conditions)}
+                ) ids
+                JOIN vulnerabilities v ON v.id = ids.vulnerability_id
+                ORDER BY v.detection_date DESC, v.id DESC
+                LIMIT %s
+            """
+            params.append(limit)
+
+        connection = get_db_connection(read_only=True)
+        if not connection:
+            return jsonify({'error': 'Database bağlantı hatası'}), 500
+
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(query, params)
+        results = cursor.fetchall()
+
+        # İlgili bildirimlerdeki tüm CVE id'lerini tek sorguda ekle
+        if results:
+            ids = [row['id'] for row in results]
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f"""
+                SELECT vulnerability_id, cve_id, cvss_score FROM vulnerability_cves
+                WHERE vulnerability_id IN ({placeholders})
+            """, ids)
+            cves_by_id = {}
+            scores_by_id = {}
+            for row in cursor.fetchall():
+                cves_by_id.setdefault(row['vulnerability_id'], []).append(row['cve_id'])
+                if row['cvss_score'] is not None:
+                    scores_by_id[row['vulnerability_id']] = row['cvss_score']
+            for row in results:
+                row.pop('cvss_score', None)
+                score = scores_by_id.get(row['id'])
+                row['cve_ids'] = cves_by_id.get(row['id'], [])
+                row['cvss_score'] = float(score) if score is not None else None
+
+        connection.close()
+
+        return jsonify({
+            'success': True,
+            'filters': {'cve': cve or None, 'vendor': vendor or None, 'product': product or None},
+            'results': results,
+            'count': len(results)
+        })
+
+    except Error as e:
+        return database_error_response(e)
 
 # İstatistikler
 @app.route('/api/stats', methods=['GET'])
 @api_key_required(['read'])
 def get_stats():
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if not connection:
             return jsonify({'error': 'Database bağlantı hatası'}), 500
         
         cursor = connection.cursor(dictionary=True)
         
+        # Tüm sayımlar data/rollup.py'nin güncellediği özet tablolardan okunur
+        
         # Toplam hesap sayısı
-        cursor.execute("SELECT COUNT(*) as total FROM accs")
+        cursor.execute("SELECT CAST(COALESCE(SUM(count), 0) AS SIGNED) as total FROM accs_hourly_rollup")
         total_accounts = cursor.fetchone()['total']
         
-        # Bölgelere göre dağılım
-        cursor.execute("SELECT region, COUNT(*) as count FROM accs WHERE region != '' GROUP BY region ORDER BY count DESC LIMIT 10")
-        regions = cursor.fetchall()
-        
-        # Domain'lere göre dağılım
-        cursor.execute("SELECT domain, COUNT(*) as count FROM accs GROUP BY domain ORDER BY count DESC LIMIT 10")
-        domains = cursor.fetchall()
+        # Varsayılan olarak bölge/domain dağılımı sketch'lerden (hata sınırlarıyla) gelir,
+        # ?exact=1 veya sketch yoksa SQL ile tam hesaplanır
+        refresh_topk_sketches(cursor)
+        sketches = TOPK_SKETCHES
+        exact = request.args.get('exact') == '1' or not sketches
+        
+        if exact:
+            # Bölgelere göre dağılım
+            cursor.execute("""
+                SELECT region, CAST(SUM(count) AS SIGNED) as count 
+                FROM accs_daily_rollup 
+                WHERE region != '' 
+                GROUP BY region 
+                ORDER BY count DESC 
+                LIMIT 10
+            """)
+            regions = cursor.fetchall()
+            
+            # Domain'lere göre dağılım
+            cursor.execute("""
+                SELECT domain, CAST(SUM(count) AS SIGNED) as count 
+                FROM accs_daily_rollup 
+                GROUP BY domain 
+                ORDER BY count DESC 
+                LIMIT 10
+            """)
+            domains = cursor.fetchall()
+        else:
+            regions = [{'region': entry.pop('item'), **entry} for entry in sketches['region'].top(10)]
+            domains = [{'domain': entry.pop('item'), **entry} for entry in sketches['domain'].top(10)]
         
         # Son 30 gün içindeki hesaplar
-        cursor.execute("SELECT COUNT(*) as count FROM accs WHERE date >= CURDATE() - INTERVAL 30 DAY")
+        cursor.execute("""
+            SELECT CAST(COALESCE(SUM(count), 0) AS SIGNED) as count 
+            FROM accs_hourly_rollup 
+            WHERE day >= CURDATE() - INTERVAL 30 DAY
+        """)
         recent_accounts = cursor.fetchone()['count']
         
         # Günlük ekleme trendi (son 7 gün)
         cursor.execute("""
-            SELECT DATE(date) as date, COUNT(*) as count 
-            FROM accs 
-            WHERE date >= CURDATE() - INTERVAL 7 DAY 
-            GROUP BY DATE(date) 
-            ORDER BY date DESC
+            SELECT day as date, CAST(SUM(count) AS SIGNED) as count 
+            FROM accs_hourly_rollup 
+            WHERE day >= CURDATE() - INTERVAL 7 DAY 
+            GROUP BY day 
+            ORDER BY day DESC
         """)
         daily_trend = cursor.fetchall()
         
@@ -688,12 +997,13 @@ def get_stats():
                 'recent_accounts_30d': recent_accounts,
                 'top_regions': regions,
                 'top_domains': domains,
+                'top_k_mode': 'exact' if exact else 'approximate',
                 'daily_trend_7d': daily_trend
             }
         })
         
     except Error as e:
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
 
 # Toplu hesap ekleme
 @app.route('/api/accounts/bulk', methods=['POST'])
@@ -750,6 +1060,7 @@ def bulk_create_accounts():
                 errors.append(f"Satır {i+1}: {str(e)}")
         
         connection.commit()
+        mark_write()
         connection.close()
         
         return jsonify({
@@ -764,7 +1075,7 @@ def bulk_create_accounts():
         })
         
     except Error as e:
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
 
 # Log'ları görüntüle (admin endpoint)
 @app.route('/api/logs', methods=['GET'])
@@ -772,7 +1083,7 @@ def bulk_create_accounts():
 @api_key_required(['read'])
 def get_logs():
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if not connection:
             return jsonify({'error': 'Database bağlantı hatası'}), 500
         
@@ -952,7 +1263,7 @@ def get_logs():
         
     except Error as e:
         app.logger.error(f"Log getirme hatası: {e}")
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
 
 # Log istatistikleri
 @app.route('/api/logs/stats', methods=['GET'])
@@ -960,7 +1271,7 @@ def get_logs():
 @api_key_required(['read'])
 def get_log_stats():
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if not connection:
             return jsonify({'error': 'Database bağlantı hatası'}), 500
         
@@ -1084,7 +1395,7 @@ def get_log_stats():
         
     except Error as e:
         app.logger.error(f"Log istatistik hatası: {e}")
-        return jsonify({'error': f'Database hatası: {str(e)}'}), 500
+        return database_error_response(e)
     try:
         # Database bağlantısını test et
         connection = get_db_connection()
@@ -1111,6 +1422,35 @@ def get_log_stats():
             'timestamp': datetime.datetime.now().isoformat()
         }), 500
 
+# Sorgu bütçeleri (admin endpoint)
+@app.route('/api/admin/query-budgets', methods=['GET', 'PUT'])
+@log_request
+@api_key_required(['write'])
+def query_budgets():
+    if request.method == 'PUT':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not data:
+            return jsonify({'error': 'JSON verisi gerekli'}), 400
+        
+        updated = {}
+        for endpoint, budget_ms in data.items():
+            # bool int'in alt sınıfı; True/False bütçe olarak kabul edilmez
+            if isinstance(budget_ms, bool) or not isinstance(budget_ms, int) or budget_ms <= 0:
+                return jsonify({
+                    'error': 'Geçersiz bütçe',
+                    'message': f'{endpoint} için pozitif bir milisaniye değeri gönderin'
+                }), 400
+            updated[endpoint] = budget_ms
+        
+        QUERY_BUDGETS.update(updated)
+        app.logger.info(f"Sorgu bütçeleri güncellendi: {updated}")
+    
+    return jsonify({
+        'success': True,
+        'budgets': QUERY_BUDGETS,
+        'timeouts': QUERY_TIMEOUT_COUNTERS
+    })
+
 # Hata yönetimi
 @app.errorhandler(404)
 def not_found(error):
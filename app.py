@@ -1,4 +1,4 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session, flash
+from flask import Flask, render_template, jsonify, request, redirect, url_for, session, flash, has_request_context
 import mysql.connector
 from mysql.connector import Error
 import logging
@@ -9,6 +9,9 @@ from functools import wraps
 import requests
 import os
 import json
+import time
+import random
+from data.domain_suffix import suffix_condition
 
 app = Flask(__name__)
 
@@ -38,6 +41,26 @@ DB_CONFIG = {
     'raise_on_warnings': True
 }
 
+# Read replica'lar - "host:port" virgülle ayrılmış (ör. DB_REPLICA_HOSTS=127.0.0.1:3307,127.0.0.1:3308)
+REPLICA_CONFIGS = []
+for replica in filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    REPLICA_CONFIGS.append({**DB_CONFIG, 'host': replica_host, 'port': int(replica_port or 3306)})
+
+# Endpoint bazında kabul edilen maksimum replica gecikmesi (saniye)
+REPLICA_MAX_STALENESS = {
+    'default': 5,
+    'dashboard': 60,
+    'api_stats': 60,
+    'api_suffix_stats': 60,
+    'api_threats': 30
+}
+
+REPLICA_LAG_CHECK_INTERVAL = int(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))  # saniye
+
+# Replica gecikme önbelleği: 'host:port' -> {'lag': saniye (None = kullanılamaz), 'checked_at': zaman}
+REPLICA_LAG = {}
+
 # API Configuration - GÜVENLİ BACKEND'TE SAKLANIR
 API_CONFIG = {
     'base_url': os.getenv('API_BASE_URL', 'http://192.168.70.71:5000'),
@@ -60,6 +83,31 @@ ADMIN_USERS = {
     }
 }
 
+# Endpoint bazında sorgu süre bütçeleri (ms) - /admin/query-budgets ile çalışma anında değiştirilebilir
+QUERY_BUDGETS = {
+    'default': int(os.getenv('QUERY_BUDGET_DEFAULT_MS', 5000)),
+    'dashboard': 3000,
+    'api_stats': 3000,
+    'api_suffix_stats': 3000,
+    'api_threats': 2000,
+    'api_search': 8000,
+    'api_search_database': 8000,
+    'debug_table_structure': 5000,
+    'test_db': 5000,
+    'health_check': 1000
+}
+
+# Bütçeyi aşan sorgu sayaçları (endpoint -> adet)
+QUERY_TIMEOUT_COUNTERS = {}
+
+# Tehdit akışı: filtresiz ilk sayfa kısa süre önbellekte tutulur (limit -> {'data', 'expires_at'})
+THREAT_FEED_CACHE_TTL = int(os.getenv('THREAT_FEED_CACHE_TTL', 15))  # saniye
+THREAT_FEED_DEFAULT_LIMIT = 50
+THREAT_FEED_CACHE = {}
+
+# MySQL: 3024 = ER_QUERY_TIMEOUT (MAX_EXECUTION_TIME aşıldı), 1317 = ER_QUERY_INTERRUPTED
+QUERY_TIMEOUT_ERRNOS = (3024, 1317)
+
 # Kategori isimlerini Türkçeye çevirme
 CATEGORY_TRANSLATIONS = {
     'government': 'Kamu Kurumları',
@@ -97,6 +145,9 @@ CATEGORY_ICONS = {
 }
 
 # Kategori sıralama öncelikleri
+# /api/stats/suffixes varsayılanları - data/data.py TARGET_DOMAINS['turkish_extensions'] ile aynı
+DEFAULT_STAT_SUFFIXES = ['.gov.tr', '.edu.tr', '.org.tr', '.bel.tr', '.k12.tr', '.tsk.tr']
+
 CATEGORY_ORDER = ['government', 'banks', 'popular_turkish', 'turkish_extensions', 'universities', 'social_media', 'email_providers', 'tech_companies']
 
 
@@ -126,17 +177,101 @@ def admin_required(f):
 
 
 # Database Functions
-def get_db_connection():
-    """Güvenli veritabanı bağlantısı"""
+def get_query_budget(endpoint=None):
+    """Endpoint için sorgu süre bütçesini (ms) döndür"""
+    if endpoint is None and has_request_context():
+        endpoint = request.endpoint
+    return QUERY_BUDGETS.get(endpoint, QUERY_BUDGETS['default'])
+
+def get_replica_lag(replica):
+    """Replica gecikmesini ölç (REPLICA_LAG_CHECK_INTERVAL boyunca önbellekte tutulur)"""
+    key = f"{replica['host']}:{replica['port']}"
+    cached = REPLICA_LAG.get(key)
+    now = time.time()
+    if cached and now - cached['checked_at'] < REPLICA_LAG_CHECK_INTERVAL:
+        return cached['lag']
+    
+    lag = None
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = mysql.connector.connect(**{**replica, 'raise_on_warnings': False}, connection_timeout=2)
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            status = cursor.fetchone()
+            lag = status['Seconds_Behind_Source'] if status else None
+        except Error:
+            # MySQL 8.0.22 öncesi
+            cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+            lag = status['Seconds_Behind_Master'] if status else None
+        connection.close()
+    except Error as e:
+        logging.warning(f"Replica gecikme kontrolü başarısız ({key}): {e}")
+    
+    REPLICA_LAG[key] = {'lag': lag, 'checked_at': now}
+    return lag
+
+def choose_read_config(endpoint=None):
+    """Okuma için gecikmesi endpoint limitinde olan bir replica seç, yoksa primary"""
+    if not REPLICA_CONFIGS:
+        return DB_CONFIG
+    
+    if endpoint is None and has_request_context():
+        endpoint = request.endpoint
+    max_staleness = REPLICA_MAX_STALENESS.get(endpoint, REPLICA_MAX_STALENESS['default'])
+    
+    candidates = []
+    for replica in REPLICA_CONFIGS:
+        lag = get_replica_lag(replica)
+        if lag is not None and lag <= max_staleness:
+            candidates.append(replica)
+    
+    return random.choice(candidates) if candidates else DB_CONFIG
+
+def get_db_connection(endpoint=None, read_only=False):
+    """Güvenli veritabanı bağlantısı - endpoint bütçesi MAX_EXECUTION_TIME olarak uygulanır,
+    read_only bağlantılar uygun bir replica'ya yönlendirilir"""
+    config = choose_read_config(endpoint) if read_only else DB_CONFIG
+    try:
+        connection = mysql.connector.connect(**config)
         if connection.is_connected():
+            cursor = connection.cursor()
+            cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (get_query_budget(endpoint),))
+            cursor.close()
             logging.info("Veritabanına başarıyla bağlanıldı.")
             return connection
     except Error as e:
-        logging.error(f"Veritabanı bağlantı hatası: {e}")
+        logging.error(f"Veritabanı bağlantı hatası ({config['host']}): {e}")
+        if config is not DB_CONFIG:
+            # Başarısızlık kontrol aralığı boyunca önbellekte kalır; ölü replica her okumada
+            # bağlantı zaman aşımını yeniden beklemez
+            REPLICA_LAG[f"{config['host']}:{config['port']}"] = {'lag': None, 'checked_at': time.time()}
+            return get_db_connection(endpoint)
         return None
 
+def is_query_timeout(error):
+    """Hata sunucu tarafı sorgu zaman aşımı mı?"""
+    return getattr(error, 'errno', None) in QUERY_TIMEOUT_ERRNOS
+
+def record_query_timeout(endpoint=None):
+    """Zaman aşımı sayacını artır"""
+    if endpoint is None and has_request_context():
+        endpoint = request.endpoint
+    endpoint = endpoint or 'unknown'
+    QUERY_TIMEOUT_COUNTERS[endpoint] = QUERY_TIMEOUT_COUNTERS.get(endpoint, 0) + 1
+    logging.warning(f"Sorgu bütçesi aşıldı: {endpoint} ({get_query_budget(endpoint)} ms)")
+
+def query_timeout_response(**extra):
+    """Bütçeyi aşan sorgular için 503 yanıtı"""
+    record_query_timeout()
+    response = {
+        'success': False,
+        'error': 'Sorgu zaman aşımına uğradı, lütfen filtreleri daraltıp tekrar deneyin',
+        'timeout_ms': get_query_budget()
+    }
+    response.update(extra)
+    return jsonify(response), 503
+
 def test_db_connection():
     """Veritabanı bağlantısını test et"""
     connection = get_db_connection()
@@ -264,6 +399,7 @@ def logout():
 def dashboard():
     """Ana dashboard sayfası"""
     connection = None
+    status_code = 200
     chart_data = []
     summary_data = {'labels': [], 'counts': [], 'percentages': [], 'colors': []}
     error = ""
@@ -275,7 +411,7 @@ def dashboard():
     }
 
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if connection:
             cursor = connection.cursor(dictionary=True)
             
@@ -359,7 +495,12 @@ def dashboard():
             logging.error("Veritabanına bağlanılamadı")
             
     except Error as e:
-        error = f"Veri çekme hatası: {str(e)}"
+        if is_query_timeout(e):
+            record_query_timeout()
+            error = "Veri çekme zaman aşımına uğradı, lütfen daha sonra tekrar deneyin."
+            status_code = 503
+        else:
+            error = f"Veri çekme hatası: {str(e)}"
         logging.error(f"Dashboard veri çekme hatası: {e}")
         if connection:
             connection.close()
@@ -370,7 +511,7 @@ def dashboard():
                          stats=stats,
                          error=error,
                          user_name=session.get('user_name'),
-                         user_role=session.get('user_role'))
+                         user_role=session.get('user_role')), status_code
 
 @app.route('/search')
 @login_required
@@ -517,7 +658,7 @@ def api_stats():
     """Gerçek zamanlı istatistikler"""
     connection = None
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if connection:
             cursor = connection.cursor(dictionary=True)
             
@@ -611,6 +752,8 @@ def api_stats():
         logging.error(f"API veri çekme hatası: {e}")
         if connection:
             connection.close()
+        if is_query_timeout(e):
+            return query_timeout_response(total_accounts=0, unique_domains=0, categories=[])
         return jsonify({
             'success': False,
             'error': str(e),
@@ -619,6 +762,170 @@ def api_stats():
             'categories': []
         })
 
+@app.route('/threats')
+@login_required
+def threats_page():
+    """Tehdit akışı sayfası"""
+    return render_template('threats.html',
+                         user_name=session.get('user_name'),
+                         user_role=session.get('user_role'))
+
+def parse_threat_cursor(cursor_value):
+    """'YYYY-MM-DD_id' biçimindeki sayfa imlecini (tarih, id) olarak çöz"""
+    date_part, _, id_part = cursor_value.partition('_')
+    return datetime.strptime(date_part, '%Y-%m-%d').date(), int(id_part)
+
+@app.route('/api/threats')
+@login_required
+def api_threats():
+    """vulnerabilities tablosundan tehdit akışı - detection_date üzerinden keyset sayfalama,
+    q ile FULLTEXT arama, type/source/channel filtreleri"""
+    query = request.args.get('q', '').strip()
+    filters = {
+        column: request.args.get(column, '').strip()
+        for column in ('type', 'source', 'channel')
+    }
+    cursor_value = request.args.get('cursor', '').strip()
+    limit = max(1, min(request.args.get('limit', THREAT_FEED_DEFAULT_LIMIT, type=int), 200))
+
+    try:
+        after = parse_threat_cursor(cursor_value) if cursor_value else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Geçersiz cursor değeri'}), 400
+
+    # Filtresiz ilk sayfa: SOC ekranının varsayılan görünümü
+    cacheable = not query and not cursor_value and not any(filters.values())
+    if cacheable:
+        cached = THREAT_FEED_CACHE.get(limit)
+        if cached and cached['expires_at'] > time.time():
+            return jsonify({**cached['data'], 'cached': True})
+
+    where_conditions = []
+    params = []
+    if query:
+        where_conditions.append("MATCH(title, content) AGAINST (%s IN NATURAL LANGUAGE MODE)")
+        params.append(query)
+    for column, value in filters.items():
+        if value:
+            where_conditions.append(f"{column} = %s")
+            params.append(value)
+    if after:
+        where_conditions.append("(detection_date < %s OR (detection_date = %s AND id < %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    where_clause = f"WHERE {' AND '.join(where_conditions)}" if where_conditions else ""
+    sql = f"""
+        SELECT id, channel, source, title, LEFT(content, 300) AS summary, detection_date, type
+        FROM vulnerabilities
+        {where_clause}
+        ORDER BY detection_date DESC, id DESC
+        LIMIT %s
+    """
+    params.append(limit + 1)
+
+    connection = None
+    try:
+        connection = get_db_connection(read_only=True)
+        if not connection:
+            return jsonify({'success': False, 'error': 'Veritabanına bağlanılamadı', 'threats': []}), 500
+
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        connection.close()
+    except Error as e:
+        logging.error(f"Tehdit akışı hatası: {e}")
+        if connection:
+            connection.close()
+        if is_query_timeout(e):
+            return query_timeout_response(threats=[])
+        return jsonify({'success': False, 'error': str(e), 'threats': []}), 500
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    for row in rows:
+        row['detection_date'] = row['detection_date'].isoformat() if row['detection_date'] else None
+
+    next_cursor = None
+    if has_more and rows[-1]['detection_date']:
+        next_cursor = f"{rows[-1]['detection_date']}_{rows[-1]['id']}"
+
+    data = {
+        'success': True,
+        'threats': rows,
+        'count': len(rows),
+        'next_cursor': next_cursor,
+        'filters': {'q': query or None, **{k: v or None for k, v in filters.items()}}
+    }
+    if cacheable:
+        THREAT_FEED_CACHE[limit] = {'data': data, 'expires_at': time.time() + THREAT_FEED_CACHE_TTL}
+    return jsonify({**data, 'cached': False})
+
+@app.route('/api/threats/<int:threat_id>')
+@login_required
+def api_threat_detail(threat_id):
+    """Tek tehdit kaydı (tam içerikle)"""
+    connection = None
+    try:
+        connection = get_db_connection(endpoint='api_threats', read_only=True)
+        if not connection:
+            return jsonify({'success': False, 'error': 'Veritabanına bağlanılamadı'}), 500
+
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, channel, source, title, content, detection_date, type
+            FROM vulnerabilities
+            WHERE id = %s
+        """, (threat_id,))
+        threat = cursor.fetchone()
+        cursor.close()
+        connection.close()
+    except Error as e:
+        logging.error(f"Tehdit detay hatası: {e}")
+        if connection:
+            connection.close()
+        if is_query_timeout(e):
+            return query_timeout_response()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    if not threat:
+        return jsonify({'success': False, 'error': 'Kayıt bulunamadı'}), 404
+
+    threat['detection_date'] = threat['detection_date'].isoformat() if threat['detection_date'] else None
+    return jsonify({'success': True, 'threat': threat})
+
+@app.route('/api/stats/suffixes')
+@login_required
+def api_suffix_stats():
+    """Uzantı / kurum domain'i bazında accs sayıları - her suffix idx_domain_rev üzerinde range seek"""
+    suffixes = [s.strip() for s in request.args.getlist('suffix') if s.strip()][:50] or DEFAULT_STAT_SUFFIXES
+
+    connection = None
+    try:
+        connection = get_db_connection(read_only=True)
+        if not connection:
+            return jsonify({'success': False, 'error': 'Veritabanına bağlanılamadı', 'suffixes': []}), 500
+
+        cursor = connection.cursor(dictionary=True)
+        results = []
+        for suffix in suffixes:
+            condition, params = suffix_condition(suffix)
+            cursor.execute(f"SELECT COUNT(*) as count FROM accs WHERE {condition}", params)
+            results.append({'suffix': suffix, 'count': cursor.fetchone()['count']})
+        cursor.close()
+        connection.close()
+
+        return jsonify({'success': True, 'suffixes': results})
+
+    except Error as e:
+        logging.error(f"Suffix istatistik hatası: {e}")
+        if connection:
+            connection.close()
+        if is_query_timeout(e):
+            return query_timeout_response(suffixes=[])
+        return jsonify({'success': False, 'error': str(e), 'suffixes': []}), 500
+
 # ✅ ARAMA FONKSİYONU - API'DEN VERİ ÇEK
 @app.route('/api/search')
 @login_required
@@ -855,6 +1162,8 @@ def fallback_database_search(query, page=1, limit=20, domain_filter='', region_f
         logging.error(f"Fallback arama hatası: {str(e)}")
         if connection:
             connection.close()
+        if is_query_timeout(e):
+            return query_timeout_response(data_source='fallback_timeout')
         return jsonify({
             'success': False,
             'error': str(e),
@@ -914,6 +1223,8 @@ def category_detail(category_name):
         logging.error(f"Kategori detay hatası: {e}")
         if connection:
             connection.close()
+        if is_query_timeout(e):
+            return query_timeout_response()
             
     return jsonify({
         'success': False,
@@ -994,6 +1305,8 @@ def debug_table_structure():
     except Exception as e:
         if connection:
             connection.close()
+        if is_query_timeout(e):
+            return query_timeout_response()
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1076,6 +1389,8 @@ def health_check():
             'timestamp': datetime.now().isoformat(),
             'database': 'connected' if db_status else 'disconnected',
             'session_active': 'user_id' in session,
+            'query_timeouts': QUERY_TIMEOUT_COUNTERS,
+            'replica_lag': {key: value['lag'] for key, value in REPLICA_LAG.items()},
             'version': '1.0.0'
         })
     except Exception as e:
@@ -1094,6 +1409,30 @@ def admin_panel():
                          user_name=session.get('user_name'),
                          user_role=session.get('user_role'))
 
+@app.route('/admin/query-budgets', methods=['GET', 'POST'])
+@admin_required
+def admin_query_budgets():
+    """Sorgu bütçelerini görüntüle / güncelle"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        updated = {}
+        for endpoint, budget_ms in data.items():
+            try:
+                budget_ms = int(budget_ms)
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': f'Geçersiz bütçe: {endpoint}'}), 400
+            if budget_ms <= 0:
+                return jsonify({'success': False, 'error': f'Bütçe pozitif olmalıdır: {endpoint}'}), 400
+            updated[endpoint] = budget_ms
+        QUERY_BUDGETS.update(updated)
+        logging.info(f"Sorgu bütçeleri güncellendi: {updated} - Kullanıcı: {session.get('user_name')}")
+    
+    return jsonify({
+        'success': True,
+        'budgets': QUERY_BUDGETS,
+        'timeouts': QUERY_TIMEOUT_COUNTERS
+    })
+
 
 # Error Handlers
 @app.errorhandler(404)
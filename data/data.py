@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import sys
+import argparse
 import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
 
+from domain_suffix import NORMALIZED_DOMAIN_SQL, DomainSuffixTrie, suffix_condition
+
 # Database bağlantı bilgileri
 DB_CONFIG = {
     'host': '192.168.70.70',
@@ -84,9 +88,76 @@ for category, domains in TARGET_DOMAINS.items():
 # Domain uzantıları için ayrı liste
 DOMAIN_EXTENSIONS = TARGET_DOMAINS["turkish_extensions"]
 
+# accs tek geçişte id aralıklarıyla (PK range scan) okunur
+ACCS_SCAN_BATCH = 50000
+# fetched_accounts'a tek executemany'de yazılacak kayıt sayısı
+INSERT_BATCH_SIZE = 1000
+
+# accs.domain'in sadeleştirilip ters çevrilmiş hali ("meb.gov.tr" -> "rt.vog.bem"); suffix
+# aramaları domain LIKE '%.gov.tr' tam taraması yerine idx_domain_rev üzerinde range seek olur
+DOMAIN_REV_EXPRESSION = f"REVERSE({NORMALIZED_DOMAIN_SQL})"
+DOMAIN_REV_COLUMN = f"""
+    ALTER TABLE accs
+        ADD COLUMN `domain_rev` varchar(255) GENERATED ALWAYS AS ({DOMAIN_REV_EXPRESSION}) STORED,
+        ADD INDEX `idx_domain_rev` (`domain_rev`)
+"""
+# İlk sürümdeki REVERSE(LOWER(domain)) kolonunu sadeleştirilmiş ifadeye çevirir
+DOMAIN_REV_MODIFY = f"""
+    ALTER TABLE accs
+        MODIFY COLUMN `domain_rev` varchar(255) GENERATED ALWAYS AS ({DOMAIN_REV_EXPRESSION}) STORED
+"""
+
+# Son işlenen accs.id (high-water mark) rollup.py ile aynı durum tablosunda tutulur
+STATE_NAME = 'fetched_accounts'
+# Artımlı çalıştırma mark'ın bu kadar gerisinden başlar: önceki tarama sırasında henüz
+# commit edilmemiş küçük id'ler yakalanır, tekrar taranan satırları unique key atlar
+HWM_RESCAN_WINDOW = 10000
+STATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS `rollup_state` (
+        `name` varchar(50) NOT NULL,
+        `last_id` bigint(20) NOT NULL DEFAULT 0,
+        `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (`name`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+"""
+
+# Tam yeniden oluşturma bu tabloya yüklenir ve RENAME TABLE ile canlı tabloyla değiştirilir
+SHADOW_TABLE = 'fetched_accounts_new'
+OLD_TABLE = 'fetched_accounts_old'
+
+# Aynı anda tek yükleme çalışsın diye alınan MySQL named lock (gölge tabloyu ikinci
+# bir yeniden oluşturmanın silmesini, incremental yazımların değişimde kaybolmasını önler)
+FETCH_LOCK_NAME = 'fetched_accounts_load'
+
+# İkincil index'ler ayrı tutulur: gölge tabloya yükleme bittikten sonra tek ALTER ile eklenir
+FETCHED_ACCOUNTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS `{table}` (
+        `id` int(11) NOT NULL AUTO_INCREMENT,
+        `spid` int(11) DEFAULT 0,
+        `domain` varchar(255) NOT NULL,
+        `region` varchar(100) DEFAULT '',
+        `source` varchar(100) DEFAULT '',
+        `category` varchar(50) DEFAULT '',
+        `fetch_date` datetime DEFAULT CURRENT_TIMESTAMP,
+        `added_date` date DEFAULT (CURDATE()),
+        PRIMARY KEY (`id`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+"""
+FETCHED_ACCOUNTS_INDEXES = """
+    ALTER TABLE `{table}`
+        ADD UNIQUE KEY `uq_spid_category` (`spid`, `category`),
+        ADD INDEX `idx_domain` (`domain`),
+        ADD INDEX `idx_category` (`category`),
+        ADD INDEX `idx_fetch_date` (`fetch_date`),
+        ADD INDEX `idx_added_date` (`added_date`)
+"""
+
+
 class DataFetcher:
     def __init__(self):
         self.connection = None
+        # bulk_insert_accounts'un yazdığı tablo; tam yeniden oluşturmada gölge tablo
+        self.target_table = 'fetched_accounts'
         self.all_accounts = []
         self.stats = {
             'total_found': 0,
@@ -128,24 +199,10 @@ class DataFetcher:
         """Fetched accounts için yeni tablo oluştur"""
         try:
             cursor = self.connection.cursor()
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS `fetched_accounts` (
-                `id` int(11) NOT NULL AUTO_INCREMENT,
-                `spid` int(11) DEFAULT 0,
-                `domain` varchar(255) NOT NULL,
-                `region` varchar(100) DEFAULT '',
-                `source` varchar(100) DEFAULT '',
-                `category` varchar(50) DEFAULT '',
-                `fetch_date` datetime DEFAULT CURRENT_TIMESTAMP,
-                `added_date` date DEFAULT (CURDATE()),
-                PRIMARY KEY (`id`),
-                INDEX `idx_domain` (`domain`),
-                INDEX `idx_category` (`category`),
-                INDEX `idx_fetch_date` (`fetch_date`),
-                INDEX `idx_added_date` (`added_date`)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
-            """
-            cursor.execute(create_table_query)
+            cursor.execute("SHOW TABLES LIKE 'fetched_accounts'")
+            if not cursor.fetchone():
+                cursor.execute(FETCHED_ACCOUNTS_TABLE.format(table='fetched_accounts'))
+                cursor.execute(FETCHED_ACCOUNTS_INDEXES.format(table='fetched_accounts'))
             self.connection.commit()
             self.log("📋 'fetched_accounts' tablosu kontrol edildi/oluşturuldu")
             return True
@@ -153,16 +210,141 @@ class DataFetcher:
             self.log(f"❌ Fetched accounts tablosu oluşturma hatası: {e}")
             return False
     
-    def clear_fetched_accounts_table(self):
-        """fetched_accounts tablosundaki tüm verileri sil"""
+    def acquire_lock(self):
+        """Oturum boyunca geçerli named lock; DDL commit'lerinden etkilenmez"""
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (FETCH_LOCK_NAME,))
+        acquired = cursor.fetchone()[0] == 1
+        cursor.close()
+        return acquired
+    
+    def has_unique_key(self):
+        """fetched_accounts yeni şemada mı (uq_spid_category var mı)"""
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'fetched_accounts'
+            AND INDEX_NAME = 'uq_spid_category'
+        """)
+        found = cursor.fetchone()[0] > 0
+        cursor.close()
+        return found
+    
+    def create_state_table(self):
+        """High-water mark durum satırını oluştur"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(STATE_TABLE)
+            cursor.execute("INSERT IGNORE INTO rollup_state (name, last_id) VALUES (%s, 0)", (STATE_NAME,))
+            self.connection.commit()
+            return True
+        except Error as e:
+            self.log(f"❌ Durum tablosu oluşturma hatası: {e}")
+            return False
+    
+    def get_high_water_mark(self):
+        """Son işlenen accs.id"""
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT last_id FROM rollup_state WHERE name = %s", (STATE_NAME,))
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row else 0
+    
+    def set_high_water_mark(self, last_id, reset=False):
+        """Mark'ı ilerlet; geriden başlayan taramada geri gitmez (reset ile doğrudan yazılır)"""
+        cursor = self.connection.cursor()
+        if reset:
+            cursor.execute("UPDATE rollup_state SET last_id = %s WHERE name = %s", (last_id, STATE_NAME))
+        else:
+            cursor.execute(
+                "UPDATE rollup_state SET last_id = GREATEST(last_id, %s) WHERE name = %s",
+                (last_id, STATE_NAME)
+            )
+        self.connection.commit()
+        cursor.close()
+    
+    def create_shadow_table(self):
+        """Önceki yarım kalmış denemeyi at, index'siz boş gölge tablo oluştur"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS `{SHADOW_TABLE}`")
+            cursor.execute(f"DROP TABLE IF EXISTS `{OLD_TABLE}`")
+            cursor.execute(FETCHED_ACCOUNTS_TABLE.format(table=SHADOW_TABLE))
+            self.connection.commit()
+            self.target_table = SHADOW_TABLE
+            self.log(f"📋 '{SHADOW_TABLE}' gölge tablosu oluşturuldu")
+            return True
+        except Error as e:
+            self.log(f"❌ Gölge tablo oluşturma hatası: {e}")
+            return False
+    
+    def drop_shadow_table(self):
+        """Başarısız yeniden oluşturmada gölge tabloyu at; canlı tablo hiç değişmemiş olur"""
+        self.target_table = 'fetched_accounts'
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS `{SHADOW_TABLE}`")
+            self.connection.commit()
+        except Error as e:
+            self.log(f"❌ Gölge tablo silme hatası: {e}")
+    
+    def swap_shadow_table(self, last_id):
+        """Gölge tabloya index'leri ekle, canlı tabloyla atomik olarak değiştir ve high-water mark'ı yaz.
+        RENAME başarılıysa değişim olmuş sayılır; sonraki adımların hataları yalnızca uyarıdır"""
+        try:
+            cursor = self.connection.cursor()
+            
+            self.log(f"🔧 {SHADOW_TABLE} index'leri oluşturuluyor...")
+            cursor.execute(FETCHED_ACCOUNTS_INDEXES.format(table=SHADOW_TABLE))
+            
+            # Tek RENAME TABLE ifadesi atomiktir: okuyucular eski ya da yeni tabloyu görür, boşluk olmaz
+            cursor.execute(
+                f"RENAME TABLE `fetched_accounts` TO `{OLD_TABLE}`, `{SHADOW_TABLE}` TO `fetched_accounts`"
+            )
+        except Error as e:
+            self.log(f"❌ Tablo değiştirme hatası: {e}")
+            return False
+        
+        self.target_table = 'fetched_accounts'
+        self.log("🔄 fetched_accounts yeni tabloyla değiştirildi")
+        
+        try:
+            # Yeniden oluşturma sırasında artımlı çalıştırmanın eski tabloya işlediği id'ler tekrar işlenir
+            self.set_high_water_mark(last_id, reset=True)
+        except Error as e:
+            self.log(f"⚠️ High-water mark yazılamadı, sonraki artımlı çalıştırma daha geriden başlayacak: {e}")
+        
+        try:
+            cursor.execute(f"DROP TABLE `{OLD_TABLE}`")
+        except Error as e:
+            # Bir sonraki yeniden oluşturma create_shadow_table içinde tekrar siler
+            self.log(f"⚠️ {OLD_TABLE} silinemedi: {e}")
+        return True
+    
+    def ensure_reversed_domain_column(self):
+        """accs.domain_rev kolonu ve index'i yoksa ekle, eski ifadeyle oluşturulduysa güncelle
+        (büyük tabloda tek seferlik uzun işlem)"""
         try:
             cursor = self.connection.cursor()
-            cursor.execute("TRUNCATE TABLE fetched_accounts")
+            cursor.execute("""
+                SELECT GENERATION_EXPRESSION FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'accs' AND COLUMN_NAME = 'domain_rev'
+            """)
+            row = cursor.fetchone()
+            if row and 'locate' in (row[0] or '').lower():
+                return True
+            
+            if row:
+                self.log("🔧 accs.domain_rev sadeleştirilmiş domain ifadesine güncelleniyor...")
+                cursor.execute(DOMAIN_REV_MODIFY)
+            else:
+                self.log("🔧 accs.domain_rev kolonu ve idx_domain_rev index'i ekleniyor...")
+                cursor.execute(DOMAIN_REV_COLUMN)
             self.connection.commit()
-            self.log("🗑️ fetched_accounts tablosu temizlendi")
+            self.log("✅ accs.domain_rev hazır")
             return True
         except Error as e:
-            self.log(f"❌ fetched_accounts tablosunu temizleme hatası: {e}")
+            self.log(f"❌ domain_rev kolonu ekleme hatası: {e}")
             return False
     
     def test_table(self):
@@ -179,8 +361,14 @@ class DataFetcher:
                 self.log("❌ 'accs' tablosu bulunamadı!")
                 return False
             
+            if not self.ensure_reversed_domain_column():
+                return False
+            
             if not self.create_fetched_accounts_table():
                 return False
+            
+            if not self.create_state_table():
+                return False
                 
             cursor.execute("SELECT COUNT(*) FROM fetched_accounts")
             fetched_count = cursor.fetchone()[0]
@@ -196,8 +384,8 @@ class DataFetcher:
         try:
             cursor = self.connection.cursor()
             
-            insert_query = """
-                INSERT IGNORE INTO fetched_accounts 
+            insert_query = f"""
+                INSERT IGNORE INTO `{self.target_table}` 
                 (spid, domain, region, source, category, fetch_date, added_date)
                 VALUES (%s, %s, %s, %s, %s, NOW(), CURDATE())
             """
@@ -216,110 +404,87 @@ class DataFetcher:
             cursor.executemany(insert_query, batch_data)
             self.connection.commit()
             
+            # (spid, category) zaten varsa INSERT IGNORE atlar; rowcount yalnızca yeni satırlar
             return cursor.rowcount
             
         except Error as e:
+            # High-water mark bu batch'in ötesine geçmesin diye tarama durdurulur
             self.log(f"❌ Toplu ekleme hatası: {e}")
-            return 0
-    
-    def fetch_external_data(self, domain_or_extension, is_extension=False):
-        """External kaynaklardan veri çek"""
-        try:
-            cursor = self.connection.cursor(dictionary=True)
-            
-            if is_extension:
-                query = """
-                    SELECT domain, region
-                    FROM accs 
-                    WHERE domain LIKE %s 
-                    AND source NOT LIKE 'AUTO-FETCH%'
-                    ORDER BY id DESC
-                """
-                search_term = f"%{domain_or_extension}"
-                log_name = f"*{domain_or_extension} uzantısı"
-            else:
-                query = """
-                    SELECT domain, region
-                    FROM accs 
-                    WHERE domain LIKE %s 
-                    AND source NOT LIKE 'AUTO-FETCH%'
-                    ORDER BY id DESC  
-                """
-                search_term = f"%{domain_or_extension}%"
-                log_name = domain_or_extension
-            
-            cursor.execute(query, (search_term,))
-            results = cursor.fetchall()
-            
-            external_accounts = []
-            for row in results:
-                if 'id' in row:
-                    del row['id']
-                if 'date' in row:
-                    del row['date']
-                external_accounts.append(row)
-            
-            if external_accounts:
-                self.log(f"🌐 {log_name}: {len(external_accounts)} kayıt bulundu")
-            else:
-                self.log(f"⚠️ {log_name}: Kayıt bulunamadı")
-            
-            return external_accounts
-            
-        except Error as e:
-            self.log(f"❌ {domain_or_extension} sorgu hatası: {e}")
-            return []
+            self.connection.rollback()
+            raise
     
-    def fetch_all_data(self):
-        """Tüm kategoriler için veri çek ve FETCHED_ACCOUNTS tablosuna ekle"""
-        self.log("🚀 Veri çekme ve FETCHED_ACCOUNTS tablosuna ekleme işlemi başlıyor...")
+    def fetch_all_data(self, start_id=0):
+        """accs tablosunu start_id'den sonrası için tek geçişte tarayıp tüm hedeflere göre
+        sınıflandır ve FETCHED_ACCOUNTS tablosuna ekle; (tamamlandı mı, son taranan id) döndürür"""
+        if start_id:
+            self.log(f"🚀 accs id {start_id} sonrası için artımlı güncelleme başlıyor...")
+        else:
+            self.log("🚀 Veri çekme ve FETCHED_ACCOUNTS tablosuna ekleme işlemi başlıyor...")
         
-        total_items = len(ALL_DOMAINS) + len(DOMAIN_EXTENSIONS)
-        self.log(f"🎯 Hedef: {len(ALL_DOMAINS)} domain + {len(DOMAIN_EXTENSIONS)} uzantı = {total_items} adet")
+        self.log(f"🎯 Hedef: {len(ALL_DOMAINS) - len(DOMAIN_EXTENSIONS)} domain + {len(DOMAIN_EXTENSIONS)} uzantı = {len(ALL_DOMAINS)} adet (tek tarama)")
         
-        current_item = 0
+        trie = DomainSuffixTrie(TARGET_DOMAINS)
+        by_target = {}
+        for category in TARGET_DOMAINS:
+            self.stats['by_category'][category] = 0
         
-        for category, domains in TARGET_DOMAINS.items():
-            if category == "turkish_extensions":
-                continue
+        last_id = start_id
+        scanned = 0
+        completed = False
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            while True:
+                cursor.execute("""
+                    SELECT id, domain, region
+                    FROM accs
+                    WHERE id > %s
+                    AND source NOT LIKE 'AUTO-FETCH%'
+                    ORDER BY id
+                    LIMIT %s
+                """, (last_id, ACCS_SCAN_BATCH))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
                 
-            self.log(f"\n📂 KATEGORİ: {category.upper()} ({len(domains)} domain)")
-            self.log("-" * 50)
-            
-            category_accounts = []
-            for domain in domains:
-                current_item += 1
-                self.log(f"📍 [{current_item}/{total_items}] {domain} işleniyor...")
+                scanned += len(rows)
                 
-                external_accounts = self.fetch_external_data(domain)
-                category_accounts.extend(external_accounts)
-                self.stats['total_found'] += len(external_accounts)
-            
-            if category_accounts:
-                added_count = self.process_category_data(category_accounts, category)
-                self.stats['by_category'][category] = added_count
-                self.log(f"📊 {category} kategorisi: {added_count} kayıt eklendi")
-            else:
-                self.stats['by_category'][category] = 0
-        
-        self.log(f"\n📂 KATEGORİ: TÜRK UZANTILARI ({len(DOMAIN_EXTENSIONS)} uzantı)")
-        self.log("-" * 50)
+                pending = {category: [] for category in TARGET_DOMAINS}
+                for row in rows:
+                    # Aynı kayıt bir kategoride birden fazla hedefe uysa da bir kez eklenir
+                    categories = set()
+                    for category, target in trie.match(row['domain']):
+                        by_target[target] = by_target.get(target, 0) + 1
+                        categories.add(category)
+                    for category in categories:
+                        # spid = kaynak accs.id; (spid, category) unique key'i tekrar eklemeyi engeller
+                        pending[category].append({'spid': row['id'], 'domain': row['domain'], 'region': row['region']})
+                        self.stats['total_found'] += 1
+                
+                for category, accounts in pending.items():
+                    self.stats['by_category'][category] += self.process_category_data(accounts, category)
+                
+                # Eşleşmeler yazıldıktan sonra ilerlet; yarıda kalan çalıştırma buradan devam eder.
+                # Gölge tabloya yüklemede high-water mark tablo değişiminden sonra yazılır
+                last_id = rows[-1]['id']
+                if self.target_table == 'fetched_accounts':
+                    self.set_high_water_mark(last_id)
+                
+                self.log(f"🔎 {scanned} kayıt tarandı (son id {last_id}), {self.stats['total_found']} eşleşme")
+            completed = True
+        except Error as e:
+            self.log(f"❌ accs tarama hatası (son id {last_id}): {e}")
+        finally:
+            cursor.close()
         
-        extension_accounts = []
-        for extension in DOMAIN_EXTENSIONS:
-            current_item += 1
-            self.log(f"📍 [{current_item}/{total_items}] {extension} uzantısı işleniyor...")
-            
-            ext_accounts = self.fetch_external_data(extension, is_extension=True)
-            extension_accounts.extend(ext_accounts)
-            self.stats['total_found'] += len(ext_accounts)
+        for target in ALL_DOMAINS:
+            count = by_target.get(target, 0)
+            if count:
+                self.log(f"🌐 {target}: {count} kayıt bulundu")
+            else:
+                self.log(f"⚠️ {target}: Kayıt bulunamadı")
         
-        if extension_accounts:
-            added_count = self.process_category_data(extension_accounts, 'turkish_extensions')
-            self.stats['by_category']['turkish_extensions'] = added_count
-            self.log(f"📊 Türk uzantıları: {added_count} kayıt eklendi")
-        else:
-            self.stats['by_category']['turkish_extensions'] = 0
+        for category, added_count in self.stats['by_category'].items():
+            self.log(f"📊 {category} kategorisi: {added_count} kayıt eklendi")
         
         self.stats['total_added'] = sum(self.stats['by_category'].values())
         self.stats['total_skipped'] = self.stats['total_found'] - self.stats['total_added']
@@ -329,6 +494,7 @@ class DataFetcher:
         self.log(f"📊 Toplam bulunan: {self.stats['total_found']} kayıt")
         self.log(f"✅ Toplam eklenen: {self.stats['total_added']} kayıt")
         self.log(f"⚠️ Zaten var olan: {self.stats['total_skipped']} kayıt")
+        return completed, last_id
     
     def process_category_data(self, accounts, category):
         """Kategori verilerini işle ve veritabanına ekle"""
@@ -337,7 +503,7 @@ class DataFetcher:
         
         self.log(f"💾 {category} kategorisinden {len(accounts)} kayıt ekleniyor...")
         
-        batch_size = 1000
+        batch_size = INSERT_BATCH_SIZE
         total_added = 0
         
         for i in range(0, len(accounts), batch_size):
@@ -395,12 +561,21 @@ class DataFetcher:
             
             self.log(f"📊 Ana veritabanı (accs): {total_accs} kayıt")
             self.log(f"📊 Fetched accounts: {total_fetched} kayıt")
+            
+            # Hedef bazında accs sayıları - her biri idx_domain_rev üzerinde range seek
+            for category, targets in TARGET_DOMAINS.items():
+                counts = []
+                for target in targets:
+                    condition, params = suffix_condition(target)
+                    cursor.execute(f"SELECT COUNT(*) as total FROM accs WHERE {condition}", params)
+                    counts.append(f"{target}={cursor.fetchone()['total']}")
+                self.log(f"📊 {category}: {', '.join(counts)}")
                 
         except Error as e:
             self.log(f"❌ İstatistik hatası: {e}")
     
-    def run(self):
-        """Ana çalıştırma fonksiyonu"""
+    def run(self, incremental=False, assume_yes=False):
+        """Ana çalıştırma fonksiyonu - incremental modda yalnızca yeni accs satırları işlenir"""
         print("💾 VERİ TOPLAMA VE FETCHED_ACCOUNTS TABLOSUNA EKLEME")
         print("="*55)
         print("🎯 ACCS tablosundan veri çeker")
@@ -411,48 +586,85 @@ class DataFetcher:
         if not self.connect_db():
             return False
         
-        if not self.test_table():
+        # Kilit bağlantı kapanınca (disconnect_db) serbest kalır; şema değişikliklerini de kapsar
+        if not self.acquire_lock():
+            self.log("⚠️ Başka bir fetched_accounts yüklemesi çalışıyor, çıkılıyor")
             self.disconnect_db()
             return False
         
-        self.get_total_stats()
-        
-        print(f"\n⚠️ Bu işlem toplam {len(ALL_DOMAINS) + len(DOMAIN_EXTENSIONS)} hedefi tarayacak")
-        print("📊 Bulunan veriler FETCHED_ACCOUNTS tablosuna eklenecek")
-        print("🗑️ Mevcut fetched_accounts verileri silinecek")
-        
-        confirm = input("\n🤔 Devam etmek istiyor musunuz? (y/N): ").lower().strip()
-        
-        if confirm not in ['y', 'yes', 'evet', 'e']:
-            self.log("❌ İşlem kullanıcı tarafından iptal edildi")
+        if not self.test_table():
             self.disconnect_db()
             return False
         
-        print("\n" + "="*55)
+        if incremental and not self.has_unique_key():
+            # Eski satırlarda kaynak accs.id (spid) yok; anahtar yerinde eklenemez. Yeni şema
+            # gölge tabloda kurulup değiştirilir, canlı tabloya o ana kadar dokunulmaz
+            self.log("⚠️ fetched_accounts eski şemada (uq_spid_category yok), tam yeniden oluşturma yapılacak")
+            incremental = False
+            assume_yes = True
         
-        if not self.clear_fetched_accounts_table():
-            self.log("❌ Tablo temizleme başarısız, işlem durduruldu")
-            self.disconnect_db()
-            return False
+        if incremental:
+            # Zamanlayıcıdan çalışır: onay sorulmaz, tablo silinmez
+            start_id = max(0, self.get_high_water_mark() - HWM_RESCAN_WINDOW)
+        else:
+            self.get_total_stats()
+            
+            print(f"\n⚠️ Bu işlem accs tablosunu tek geçişte {len(ALL_DOMAINS)} hedefe göre tarayacak")
+            print("📊 Bulunan veriler FETCHED_ACCOUNTS tablosuna eklenecek")
+            print("🔄 fetched_accounts yeni tabloda oluşturulup tek adımda değiştirilecek")
+            
+            if not assume_yes:
+                confirm = input("\n🤔 Devam etmek istiyor musunuz? (y/N): ").lower().strip()
+                
+                if confirm not in ['y', 'yes', 'evet', 'e']:
+                    self.log("❌ İşlem kullanıcı tarafından iptal edildi")
+                    self.disconnect_db()
+                    return False
+            
+            print("\n" + "="*55)
+            
+            # Yükleme süresince dashboard mevcut tabloyu okumaya devam eder
+            if not self.create_shadow_table():
+                self.log("❌ Gölge tablo oluşturulamadı, işlem durduruldu")
+                self.disconnect_db()
+                return False
+            start_id = 0
+        
+        completed, last_id = self.fetch_all_data(start_id)
         
-        self.fetch_all_data()
+        if not incremental:
+            if completed:
+                completed = self.swap_shadow_table(last_id)
+            if not completed:
+                self.drop_shadow_table()
+                self.log("❌ Yeniden oluşturma tamamlanamadı, mevcut fetched_accounts korundu")
         
         self.print_summary()
         
         self.disconnect_db()
-        return True
+        return completed
 
 def main():
     """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="accs kayıtlarını hedeflere göre fetched_accounts tablosuna işle")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Yalnızca son işlenen accs.id sonrasını işle (onay sormaz)")
+    parser.add_argument('--yes', '-y', action='store_true', help="Tam yeniden oluşturmada onay sorma")
+    args = parser.parse_args()
+    
+    success = False
     try:
         fetcher = DataFetcher()
-        fetcher.run()
+        success = fetcher.run(incremental=args.incremental, assume_yes=args.yes)
         
     except KeyboardInterrupt:
         print("\n\n⚠️ İşlem kullanıcı tarafından durduruldu!")
         
     except Exception as e:
         print(f"\n❌ Beklenmeyen hata: {e}")
+    
+    # Zamanlayıcılar başarısız çalıştırmayı çıkış koduyla görür
+    sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
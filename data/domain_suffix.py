@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Domain suffix eşleştirme yardımcıları (data.py sınıflandırması ve dashboard sayımları ortak kullanır)"""
+
+# normalize_domain'in SQL karşılığı: şema, yol/sorgu/parça, port ve baştaki/sondaki
+# noktalar atılır ("https://MEB.gov.tr./x" -> "meb.gov.tr"). Sınıflandırma ile accs.domain_rev
+# sayımlarının tutarlı kalması için normalize_domain ile birlikte değiştirilmelidir
+NORMALIZED_DOMAIN_SQL = """
+    TRIM(BOTH '.' FROM
+        SUBSTRING_INDEX(SUBSTRING_INDEX(SUBSTRING_INDEX(SUBSTRING_INDEX(
+            IF(LOCATE('://', TRIM(LOWER(`domain`))) > 0,
+               SUBSTRING(TRIM(LOWER(`domain`)), LOCATE('://', TRIM(LOWER(`domain`))) + 3),
+               TRIM(LOWER(`domain`))),
+        '/', 1), '?', 1), '#', 1), ':', 1))
+"""
+
+
+def prefix_range(prefix):
+    """prefix ile başlayan değerleri kapsayan yarı açık [alt, üst) aralık"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def suffix_condition(suffix, column='domain_rev'):
+    """Domain suffix'ini ters kolon üzerinde index range koşuluna çevir; (sql, params) döndürür.
+
+    ".gov.tr" gibi uzantılar yalnızca aralık, "meb.gov.tr" gibi domainler ise
+    kendisi + alt domainleri (label sınırında) olarak eşleşir.
+    """
+    reversed_suffix = suffix.strip().lower()[::-1]
+    if suffix.startswith('.'):
+        low, high = prefix_range(reversed_suffix)
+        return f"({column} >= %s AND {column} < %s)", [low, high]
+    low, high = prefix_range(reversed_suffix + '.')
+    return f"({column} = %s OR ({column} >= %s AND {column} < %s))", [reversed_suffix, low, high]
+
+
+def normalize_domain(value):
+    """Domain değerini karşılaştırma için sadeleştir (şema, yol, port, sondaki nokta atılır)"""
+    domain = (value or '').strip().lower()
+    if '://' in domain:
+        domain = domain.split('://', 1)[1]
+    for separator in ('/', '?', '#', ':'):
+        domain = domain.split(separator, 1)[0]
+    return domain.strip('.')
+
+
+class DomainSuffixTrie:
+    """Ters çevrilmiş label'lar üzerinde suffix trie.
+
+    "meb.gov.tr" hedefi tr -> gov -> meb yolu olarak saklanır. Bir domain'in
+    label'ları sondan başa yürünerek yoldaki tüm hedefler (ör. hem ".gov.tr"
+    uzantısı hem "meb.gov.tr") hedef sayısından bağımsız tek geçişte bulunur.
+    Eşleşme label sınırındadır: "xmeb.gov.tr", "meb.gov.tr" hedefiyle eşleşmez.
+    """
+
+    TARGETS = None  # düğümdeki (kategori, hedef) listesinin anahtarı
+
+    def __init__(self, target_domains=None):
+        self.root = {}
+        for category, targets in (target_domains or {}).items():
+            for target in targets:
+                self.add(target, category)
+
+    def add(self, suffix, category):
+        node = self.root
+        for label in reversed(normalize_domain(suffix).split('.')):
+            node = node.setdefault(label, {})
+        node.setdefault(self.TARGETS, []).append((category, suffix))
+
+    def match(self, domain):
+        """Domain'in eşleştiği (kategori, hedef) çiftleri"""
+        matches = []
+        node = self.root
+        for label in reversed(normalize_domain(domain).split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            matches.extend(node.get(self.TARGETS, ()))
+        return matches
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import heapq
+import json
+import time
+import mysql.connector
+from mysql.connector import Error
+from datetime import datetime
+
+# Database bağlantı bilgileri
+DB_CONFIG = {
+    'host': '192.168.70.70',
+    'database': 'lapsusacc',
+    'user': 'root',
+    'password': 'daaqwWdas21as',
+    'charset': 'utf8mb4',
+    'port': 3306
+}
+
+# Tek transaction'da işlenecek maksimum accs.id aralığı
+BATCH_SIZE = 200000
+
+# Tarihi olmayan kayıtlar bu güne yazılır (toplamlar accs ile birebir kalsın diye)
+NULL_DATE_DAY = '1970-01-01'
+
+# Bir MAX(id) gözlemi ancak bu kadar saniye eskidiğinde işlenir: o an id'si ayrılmış ama
+# henüz commit edilmemiş daha küçük id'li satırlar görünür hale gelmiş olur
+ROLLUP_SETTLE_SECONDS = 60
+
+# Sürekli modda özetlerin accs'ten baştan hesaplanma aralığı (güncelleme/silmeler yansısın diye)
+RECONCILE_INTERVAL = 24 * 3600
+
+# Aynı anda tek refresh/reconcile çalışsın diye alınan MySQL named lock
+ROLLUP_LOCK_NAME = 'accs_rollup'
+
+# /api/stats'ın yaklaşık top-K cevabı için domain/bölge sketch'leri; accs'in tamamı
+# bu süreçte, high-water mark ile aynı transaction'da işlenir (tek yazar)
+TOPK_SKETCH_CAPACITY = 1000
+TOPK_FIELDS = ('domain', 'region')
+
+# Özet tabloları ve accs'ten dolduran sorgular; refresh aralık ekler, reconcile baştan kurar
+ROLLUP_SELECTS = {
+    'accs_daily_rollup': """
+        INSERT INTO `{table}` (day, region, domain, source, count)
+        SELECT
+            COALESCE(DATE(date), %s),
+            LEFT(COALESCE(region, ''), 100),
+            LEFT(COALESCE(domain, ''), 255),
+            LEFT(COALESCE(source, ''), 100),
+            COUNT(*)
+        FROM accs
+        WHERE id > %s AND id <= %s
+        GROUP BY 1, 2, 3, 4
+    """,
+    'accs_hourly_rollup': """
+        INSERT INTO `{table}` (day, hour, count)
+        SELECT
+            COALESCE(DATE(date), %s),
+            COALESCE(HOUR(date), 0),
+            COUNT(*)
+        FROM accs
+        WHERE id > %s AND id <= %s
+        GROUP BY 1, 2
+    """
+}
+
+ROLLUP_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS `accs_daily_rollup` (
+        `day` date NOT NULL,
+        `region` varchar(100) NOT NULL DEFAULT '',
+        `domain` varchar(255) NOT NULL DEFAULT '',
+        `source` varchar(100) NOT NULL DEFAULT '',
+        `count` int(11) NOT NULL DEFAULT 0,
+        PRIMARY KEY (`day`, `region`, `domain`, `source`),
+        INDEX `idx_domain` (`domain`),
+        INDEX `idx_region` (`region`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `accs_hourly_rollup` (
+        `day` date NOT NULL,
+        `hour` tinyint(4) NOT NULL,
+        `count` int(11) NOT NULL DEFAULT 0,
+        PRIMARY KEY (`day`, `hour`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `rollup_state` (
+        `name` varchar(50) NOT NULL,
+        `last_id` bigint(20) NOT NULL DEFAULT 0,
+        `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (`name`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `stream_sketches` (
+        `name` varchar(50) NOT NULL,
+        `capacity` int(11) NOT NULL,
+        `state` mediumtext NOT NULL,
+        `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (`name`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+    """
+]
+
+
+class SpaceSavingSketch:
+    """Ağırlıklı space-saving sketch; her sayaç [count, error] (count üst, count - error alt sınır).
+
+    En küçük sayaç (count, öğe) min-heap'inden bulunur; sayaç artınca eski heap
+    kaydı silinmez, pop sırasında güncel değerle uyuşmayanlar atlanır. Heap
+    kapasitenin iki katını geçince güncel kayıtlarla yeniden kurulur, böylece
+    her güncelleme amortize O(log k) olur.
+    """
+
+    def __init__(self, capacity, counters=None):
+        self.capacity = capacity
+        self.counters = counters or {}
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self.heap = [(counter[0], item) for item, counter in self.counters.items()]
+        heapq.heapify(self.heap)
+
+    def _push(self, item):
+        heapq.heappush(self.heap, (self.counters[item][0], item))
+        if len(self.heap) > 2 * self.capacity:
+            self._rebuild_heap()
+
+    def add(self, item, amount=1):
+        if item in self.counters:
+            self.counters[item][0] += amount
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [amount, 0]
+        else:
+            # En küçük sayacı devral; eski değeri yeni öğenin hata payı olur
+            while True:
+                min_count, min_item = heapq.heappop(self.heap)
+                counter = self.counters.get(min_item)
+                if counter is not None and counter[0] == min_count:
+                    break
+            del self.counters[min_item]
+            self.counters[item] = [min_count + amount, min_count]
+        self._push(item)
+
+    def to_json(self):
+        return json.dumps(self.counters, ensure_ascii=False)
+
+
+class RollupBuilder:
+    """accs tablosunu accs.id high-water mark'ından itibaren günlük/saatlik özet tablolara işler.
+
+    Yalnızca yeni eklenen satırlar işlenir; mevcut satırlardaki güncelleme ve
+    silmeler --reconcile (sürekli modda her RECONCILE_INTERVAL) ile yansıtılır.
+    """
+
+    STATE_NAME = 'accs_rollup'
+    # Son gözlenen MAX(id) ve gözlem zamanı (updated_at)
+    FRONTIER_NAME = 'accs_rollup_frontier'
+
+    def __init__(self):
+        self.connection = None
+        self.sketches = {}
+
+    def log(self, message):
+        """Log mesajı yazdır"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] {message}")
+
+    def connect_db(self):
+        """Veritabanına bağlan"""
+        try:
+            self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection.is_connected()
+        except Error as e:
+            self.log(f"❌ Database bağlantı hatası: {e}")
+            return False
+
+    def disconnect_db(self):
+        """Veritabanı bağlantısını kapat"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+
+    def create_tables(self):
+        """Özet tablolarını ve high-water mark satırını oluştur"""
+        cursor = self.connection.cursor()
+        for create_table_query in ROLLUP_TABLES:
+            cursor.execute(create_table_query)
+        cursor.executemany(
+            "INSERT IGNORE INTO rollup_state (name, last_id) VALUES (%s, 0)",
+            [(self.STATE_NAME,), (self.FRONTIER_NAME,)]
+        )
+        self.connection.commit()
+        cursor.close()
+
+    def acquire_lock(self):
+        """Oturum boyunca geçerli named lock; DDL commit'lerinden etkilenmez"""
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (ROLLUP_LOCK_NAME,))
+        acquired = cursor.fetchone()[0] == 1
+        cursor.close()
+        return acquired
+
+    def settled_max_id(self):
+        """İşlenmesi güvenli en büyük accs.id'yi döndür ve yeni MAX(id) gözlemini kaydet.
+
+        ROLLUP_SETTLE_SECONDS'tan eski gözlem güvenli sınır olur; daha yeni bir gözlem
+        varsa beklenir. Böylece geç commit edilen küçük id'ler atlanmaz.
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT last_id, TIMESTAMPDIFF(SECOND, updated_at, NOW()) FROM rollup_state WHERE name = %s",
+                (self.FRONTIER_NAME,)
+            )
+            frontier, age = cursor.fetchone()
+            if age is not None and age < ROLLUP_SETTLE_SECONDS:
+                return None
+
+            cursor.execute("SELECT MAX(id) FROM accs")
+            max_id = cursor.fetchone()[0] or 0
+            cursor.execute(
+                "UPDATE rollup_state SET last_id = %s, updated_at = NOW() WHERE name = %s",
+                (max_id, self.FRONTIER_NAME)
+            )
+            self.connection.commit()
+            return frontier
+        finally:
+            cursor.close()
+
+    def save_sketches(self, cursor):
+        """Sketch'leri yaz (commit çağırana aittir)"""
+        for field, sketch in self.sketches.items():
+            cursor.execute("""
+                INSERT INTO stream_sketches (name, capacity, state) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE capacity = VALUES(capacity), state = VALUES(state)
+            """, (f"topk_{field}", sketch.capacity, sketch.to_json()))
+
+    def seed_sketches(self):
+        """Sketch'leri özet tablosundaki tam top-N ile yeniden kur ve kaydet.
+
+        Tohumda izlenmeyen her öğe en küçük sayaçtan küçüktür, dolayısıyla hata
+        payı 0 ile başlamak space-saving garantisini bozmaz.
+        """
+        cursor = self.connection.cursor()
+        try:
+            for field in TOPK_FIELDS:
+                cursor.execute(f"""
+                    SELECT {field}, CAST(SUM(count) AS SIGNED)
+                    FROM accs_daily_rollup
+                    WHERE {field} != ''
+                    GROUP BY {field}
+                    ORDER BY 2 DESC
+                    LIMIT %s
+                """, (TOPK_SKETCH_CAPACITY,))
+                counters = {item: [count, 0] for item, count in cursor.fetchall()}
+                self.sketches[field] = SpaceSavingSketch(TOPK_SKETCH_CAPACITY, counters)
+            self.save_sketches(cursor)
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def load_sketches(self):
+        """Kalıcı sketch'leri yükle; eksikse özet tablosundan tohumla"""
+        cursor = self.connection.cursor()
+        try:
+            for field in TOPK_FIELDS:
+                cursor.execute("SELECT capacity, state FROM stream_sketches WHERE name = %s", (f"topk_{field}",))
+                row = cursor.fetchone()
+                if not row:
+                    self.sketches = {}
+                    break
+                self.sketches[field] = SpaceSavingSketch(row[0], json.loads(row[1]))
+        finally:
+            cursor.close()
+        if not self.sketches:
+            self.seed_sketches()
+
+    def rebuild(self):
+        """Özet tablolarını boşalt ve high-water mark'ı sıfırla"""
+        cursor = self.connection.cursor()
+        cursor.execute("TRUNCATE TABLE accs_daily_rollup")
+        cursor.execute("TRUNCATE TABLE accs_hourly_rollup")
+        cursor.execute("UPDATE rollup_state SET last_id = 0 WHERE name = %s", (self.STATE_NAME,))
+        self.connection.commit()
+        cursor.close()
+        self.seed_sketches()
+        self.log("🗑️ Özet tabloları sıfırlandı")
+
+    def refresh_batch(self, settled_id):
+        """settled_id'yi aşmadan bir sonraki id aralığını işle, işlenen satır aralığını döndür"""
+        cursor = self.connection.cursor()
+        try:
+            self.connection.start_transaction()
+
+            # Aynı anda çalışan iki refresh'in aynı aralığı iki kez saymasını engeller
+            cursor.execute(
+                "SELECT last_id FROM rollup_state WHERE name = %s FOR UPDATE",
+                (self.STATE_NAME,)
+            )
+            last_id = cursor.fetchone()[0]
+
+            upper_id = min(settled_id, last_id + BATCH_SIZE)
+
+            if upper_id <= last_id:
+                self.connection.rollback()
+                return 0
+
+            for table, query in ROLLUP_SELECTS.items():
+                cursor.execute(
+                    query.format(table=table) + " ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+                    (NULL_DATE_DAY, last_id, upper_id)
+                )
+
+            # Sketch'ler aynı aralıkla ve aynı transaction'da güncellenir: mark ile birlikte
+            # ilerler, hata olursa bellekteki hali atılıp kalıcı halden yeniden yüklenir
+            cursor.execute("""
+                SELECT LEFT(COALESCE(domain, ''), 255), LEFT(COALESCE(region, ''), 100), COUNT(*)
+                FROM accs
+                WHERE id > %s AND id <= %s
+                GROUP BY 1, 2
+            """, (last_id, upper_id))
+            for domain, region, count in cursor.fetchall():
+                for field, value in (('domain', domain), ('region', region)):
+                    if value:
+                        self.sketches[field].add(value, count)
+            self.save_sketches(cursor)
+
+            cursor.execute(
+                "UPDATE rollup_state SET last_id = %s WHERE name = %s",
+                (upper_id, self.STATE_NAME)
+            )
+            self.connection.commit()
+            self.log(f"✅ accs id {last_id + 1}-{upper_id} özet tablolarına işlendi")
+            return upper_id - last_id
+
+        except Error:
+            self.connection.rollback()
+            self.sketches = {}
+            raise
+        finally:
+            cursor.close()
+
+    def refresh(self):
+        """High-water mark'tan itibaren yerleşmiş (settled) tüm yeni satırları işle"""
+        settled_id = self.settled_max_id()
+        if not settled_id:
+            return 0
+        if not self.sketches:
+            self.load_sketches()
+        total = 0
+        while True:
+            processed = self.refresh_batch(settled_id)
+            if not processed:
+                break
+            total += processed
+        return total
+
+    def reconcile(self):
+        """Özetleri high-water mark'a kadar accs'ten baştan hesapla ve atomik olarak değiştir.
+
+        Refresh yalnızca yeni satırları eklediğinden accs'te sonradan yapılan
+        güncelleme ve silmeler ancak burada yansır. Okuyucular değişim anına kadar
+        eski tabloları görür.
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT last_id FROM rollup_state WHERE name = %s", (self.STATE_NAME,))
+            last_id = cursor.fetchone()[0]
+
+            renames = []
+            for table, query in ROLLUP_SELECTS.items():
+                cursor.execute(f"DROP TABLE IF EXISTS `{table}_new`")
+                cursor.execute(f"DROP TABLE IF EXISTS `{table}_old`")
+                cursor.execute(f"CREATE TABLE `{table}_new` LIKE `{table}`")
+                cursor.execute(query.format(table=f"{table}_new"), (NULL_DATE_DAY, 0, last_id))
+                self.connection.commit()
+                renames.append(f"`{table}` TO `{table}_old`, `{table}_new` TO `{table}`")
+
+            # İki tablo tek RENAME ile değişir; günlük ve saatlik toplamlar tutarlı kalır
+            cursor.execute("RENAME TABLE " + ", ".join(renames))
+            for table in ROLLUP_SELECTS:
+                cursor.execute(f"DROP TABLE IF EXISTS `{table}_old`")
+            # Sketch birikmiş hata payından arınır, silinen/güncellenen satırlar da yansır
+            self.seed_sketches()
+            self.log(f"🔄 Özetler accs id {last_id}'e kadar baştan hesaplandı")
+        finally:
+            cursor.close()
+
+    def run(self, rebuild=False, interval=None, reconcile=False):
+        """Ana çalıştırma fonksiyonu - interval verilirse sürekli çalışır"""
+        if not self.connect_db():
+            return False
+
+        try:
+            self.create_tables()
+            if not self.acquire_lock():
+                self.log("⚠️ Başka bir özet güncellemesi çalışıyor, çıkılıyor")
+                return False
+            if rebuild:
+                self.rebuild()
+
+            last_reconcile = time.time()
+            while True:
+                start = time.time()
+                total = self.refresh()
+                if total:
+                    self.log(f"📊 {total} id aralığı {time.time() - start:.2f}s içinde işlendi")
+
+                if reconcile or (interval and time.time() - last_reconcile >= RECONCILE_INTERVAL):
+                    self.reconcile()
+                    last_reconcile = time.time()
+                    reconcile = False
+
+                if not interval:
+                    break
+                time.sleep(interval)
+
+        except Error as e:
+            self.log(f"❌ Özet güncelleme hatası: {e}")
+            return False
+        finally:
+            self.disconnect_db()
+
+        return True
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="accs günlük/saatlik özet tablolarını güncelle")
+    parser.add_argument('--rebuild', action='store_true', help="Özetleri sıfırdan oluştur")
+    parser.add_argument('--interval', type=int, default=None, help="Saniye cinsinden tekrar aralığı")
+    parser.add_argument('--reconcile', action='store_true',
+                        help="Özetleri accs'ten baştan hesapla (güncelleme/silmeleri yansıtır)")
+    args = parser.parse_args()
+
+    try:
+        RollupBuilder().run(rebuild=args.rebuild, interval=args.interval, reconcile=args.reconcile)
+    except KeyboardInterrupt:
+        print("\n\n⚠️ İşlem kullanıcı tarafından durduruldu!")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ License: MIT
 
 import os
 import sys
+import json
 import asyncio
 import logging
 from typing import Optional, List, Dict, Any, Union
@@ -16,9 +17,9 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
 import platform
-import schedule
 import time
-from threading import Thread
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 import pymysql
 from telegram import Update, BotCommand
@@ -29,7 +30,7 @@ from telegram.ext import (
     Application
 )
 from telegram.constants import ParseMode
-from telegram.error import TelegramError
+from telegram.error import TelegramError, RetryAfter, Forbidden, BadRequest, NetworkError
 
 # =====================================
 # CONFIGURATION & CONSTANTS
@@ -47,6 +48,16 @@ class BotConfig:
     db_port: int = 3306
     max_retry_attempts: int = 3
     connection_timeout: int = 30
+    query_timeout_ms: int = 10000
+    db_pool_size: int = 5
+    pool_health_check_interval: int = 30
+    report_dir: str = "reports"
+    delivery_rate_per_second: float = 25.0
+    delivery_concurrency: int = 8
+    delivery_max_attempts: int = 5
+    delivery_retry_rounds: int = 6
+    report_completion_wait: int = 3600
+    stats_cache_ttl: int = 300
     log_level: str = "INFO"
 
 class Config:
@@ -66,6 +77,16 @@ class Config:
             db_port=int(os.getenv("DB_PORT", "3306")),
             max_retry_attempts=int(os.getenv("MAX_RETRY_ATTEMPTS", "3")),
             connection_timeout=int(os.getenv("CONNECTION_TIMEOUT", "30")),
+            query_timeout_ms=int(os.getenv("QUERY_TIMEOUT_MS", "10000")),
+            db_pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            pool_health_check_interval=int(os.getenv("POOL_HEALTH_CHECK_INTERVAL", "30")),
+            report_dir=os.getenv("REPORT_DIR", "reports"),
+            delivery_rate_per_second=float(os.getenv("DELIVERY_RATE_PER_SECOND", "25")),
+            delivery_concurrency=int(os.getenv("DELIVERY_CONCURRENCY", "8")),
+            delivery_max_attempts=int(os.getenv("DELIVERY_MAX_ATTEMPTS", "5")),
+            delivery_retry_rounds=int(os.getenv("DELIVERY_RETRY_ROUNDS", "6")),
+            report_completion_wait=int(os.getenv("REPORT_COMPLETION_WAIT", "3600")),
+            stats_cache_ttl=int(os.getenv("STATS_CACHE_TTL", "300")),
             log_level=os.getenv("LOG_LEVEL", "INFO")
         )
 
@@ -73,28 +94,174 @@ class Config:
 # DATABASE MANAGER
 # =====================================
 
+class QueryTimeoutError(Exception):
+    """Raised when a query exceeds its server-side execution budget"""
+
 class DatabaseManager:
     """Professional database connection and query manager"""
     
+    # MySQL: 3024 = ER_QUERY_TIMEOUT (MAX_EXECUTION_TIME exceeded), 1317 = ER_QUERY_INTERRUPTED
+    TIMEOUT_ERRNOS = (3024, 1317)
+    
     def __init__(self, config: BotConfig):
         self.config = config
-        self._connection_pool = []
+        # Idle connections as (connection, last_used) - LIFO keeps the warmest ones in use
+        self._connection_pool: asyncio.LifoQueue = asyncio.LifoQueue(maxsize=config.db_pool_size)
+        self._pool_created = 0
+        # Borrowed-connection capacity; released on return *and* on discard so waiters
+        # always wake up and open a fresh connection when a broken one is dropped
+        self._capacity = asyncio.Semaphore(config.db_pool_size)
+        # Dedicated bounded executor so blocking DB calls never starve the default executor
+        self._executor = ThreadPoolExecutor(max_workers=config.db_pool_size, thread_name_prefix="lapsus-db")
+        self.pool_stats: Dict[str, Any] = {
+            'acquires': 0,
+            'acquire_time_total': 0.0,
+            'acquire_time_max': 0.0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+        }
+        # Per-command query budgets in milliseconds, adjustable at runtime via /sorgubutce
+        self.query_budgets: Dict[str, int] = {
+            'default': config.query_timeout_ms,
+            'daily_report': config.query_timeout_ms * 2,
+            'statistics': config.query_timeout_ms,
+            'regions': config.query_timeout_ms,
+        }
+        self.timeout_counters: Dict[str, int] = {}
+        
+    async def _run(self, func, *args):
+        """Run blocking database call on the dedicated executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+    
+    async def warm_pool(self):
+        """Pre-open all pooled connections"""
+        missing = self.config.db_pool_size - self._pool_created
+        self._pool_created += missing
+        results = await asyncio.gather(
+            *(self._run(self._create_connection) for _ in range(missing)),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self._pool_created -= 1
+                logging.error(f"Pool warm-up connection failed: {result}")
+            else:
+                self.pool_stats['connections_created'] += 1
+                self._connection_pool.put_nowait((result, time.monotonic()))
+        logging.info(f"Database pool warmed: {self._connection_pool.qsize()}/{self.config.db_pool_size} connections")
+    
+    @staticmethod
+    def _ping(connection: pymysql.Connection) -> bool:
+        """Check that an idle connection is still usable"""
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except pymysql.Error:
+            return False
+    
+    async def _discard(self, connection: pymysql.Connection):
+        """Close a broken connection; the caller's capacity slot is released separately"""
+        self._pool_created -= 1
+        self.pool_stats['connections_discarded'] += 1
+        try:
+            await self._run(connection.close)
+        except Exception:
+            pass
+    
+    async def _acquire(self) -> pymysql.Connection:
+        """Take a healthy connection from the pool, opening one if none is idle"""
+        start = time.perf_counter()
+        await self._capacity.acquire()
+        try:
+            while True:
+                try:
+                    connection, last_used = self._connection_pool.get_nowait()
+                except asyncio.QueueEmpty:
+                    # Holding a capacity slot with no idle connection means fewer than
+                    # db_pool_size are borrowed, so opening one stays within the limit
+                    self._pool_created += 1
+                    try:
+                        connection = await self._run(self._create_connection)
+                    except Exception:
+                        self._pool_created -= 1
+                        raise
+                    self.pool_stats['connections_created'] += 1
+                    break
+                
+                # Only connections idle past the interval pay for a health check round trip
+                if time.monotonic() - last_used < self.config.pool_health_check_interval:
+                    break
+                if await self._run(self._ping, connection):
+                    break
+                logging.warning("Discarding unhealthy pooled connection")
+                await self._discard(connection)
+        except BaseException:
+            self._capacity.release()
+            raise
         
+        elapsed = time.perf_counter() - start
+        self.pool_stats['acquires'] += 1
+        self.pool_stats['acquire_time_total'] += elapsed
+        self.pool_stats['acquire_time_max'] = max(self.pool_stats['acquire_time_max'], elapsed)
+        if elapsed > 0.5:
+            logging.warning(f"Slow pool acquire: {elapsed * 1000:.0f} ms")
+        return connection
+    
+    async def _return(self, connection: pymysql.Connection):
+        """Put a borrowed connection back as idle"""
+        try:
+            self._connection_pool.put_nowait((connection, time.monotonic()))
+        except asyncio.QueueFull:
+            # Only possible while warm_pool is still filling the pool
+            await self._discard(connection)
+    
     @asynccontextmanager
     async def get_connection(self):
-        """Get database connection with proper cleanup"""
-        connection = None
+        """Borrow a pooled database connection, returning it afterwards"""
+        connection = await self._acquire()
         try:
-            connection = await asyncio.get_event_loop().run_in_executor(
-                None, self._create_connection
-            )
             yield connection
         except pymysql.Error as e:
-            logging.error(f"Database connection error: {e}")
+            # Statement timeouts leave the connection usable; anything else may not
+            if e.args and e.args[0] in self.TIMEOUT_ERRNOS:
+                await self._return(connection)
+            else:
+                logging.error(f"Database connection error: {e}")
+                await self._discard(connection)
+            raise
+        except BaseException:
+            await self._discard(connection)
             raise
+        else:
+            await self._return(connection)
         finally:
-            if connection:
+            self._capacity.release()
+    
+    def get_pool_status(self) -> Dict[str, Any]:
+        """Pool size and acquire latency summary"""
+        acquires = self.pool_stats['acquires']
+        return {
+            'size': self.config.db_pool_size,
+            'open': self._pool_created,
+            'idle': self._connection_pool.qsize(),
+            'acquires': acquires,
+            'avg_acquire_ms': (self.pool_stats['acquire_time_total'] / acquires * 1000) if acquires else 0.0,
+            'max_acquire_ms': self.pool_stats['acquire_time_max'] * 1000,
+            'connections_created': self.pool_stats['connections_created'],
+            'connections_discarded': self.pool_stats['connections_discarded'],
+        }
+    
+    def close(self):
+        """Close idle pooled connections and stop the executor"""
+        while not self._connection_pool.empty():
+            connection, _ = self._connection_pool.get_nowait()
+            try:
                 connection.close()
+            except Exception:
+                pass
+        self._pool_created = 0
+        self._executor.shutdown(wait=False)
     
     def _create_connection(self) -> pymysql.Connection:
         """Create new database connection"""
@@ -112,29 +279,83 @@ class DatabaseManager:
             write_timeout=self.config.connection_timeout
         )
     
-    async def execute_query(self, query: str, params: Optional[tuple] = None) -> Optional[List[Dict[str, Any]]]:
-        """Execute database query with error handling and retries"""
+    def get_budget(self, budget: str) -> int:
+        """Get query budget (ms) for a command, falling back to default"""
+        return self.query_budgets.get(budget, self.query_budgets['default'])
+    
+    def set_budget(self, budget: str, budget_ms: int):
+        """Adjust a query budget at runtime"""
+        if budget_ms <= 0:
+            raise ValueError("Budget must be a positive number of milliseconds")
+        self.query_budgets[budget] = budget_ms
+        logging.info(f"Query budget updated: {budget} = {budget_ms} ms")
+    
+    @staticmethod
+    def _with_time_limit(query: str, budget_ms: int) -> str:
+        """Add MAX_EXECUTION_TIME optimizer hint to SELECT statements"""
+        stripped = query.lstrip()
+        if stripped[:6].upper() != 'SELECT':
+            return query
+        return f"SELECT /*+ MAX_EXECUTION_TIME({budget_ms}) */{stripped[6:]}"
+    
+    async def execute_query(self, query: str, params: Optional[tuple] = None,
+                            budget: str = 'default') -> Optional[List[Dict[str, Any]]]:
+        """Execute database query with error handling, retries and a server-side time budget"""
+        budget_ms = self.get_budget(budget)
+        query = self._with_time_limit(query, budget_ms)
+        
         for attempt in range(self.config.max_retry_attempts):
             try:
                 async with self.get_connection() as conn:
-                    with conn.cursor() as cursor:
-                        cursor.execute(query, params)
-                        return cursor.fetchall()
+                    return await self._run(self._fetch_all, conn, query, params)
             except pymysql.Error as e:
+                if e.args and e.args[0] in self.TIMEOUT_ERRNOS:
+                    # Retrying an over-budget query only holds the server longer
+                    self.timeout_counters[budget] = self.timeout_counters.get(budget, 0) + 1
+                    logging.warning(f"Query exceeded {budget_ms} ms budget ({budget}): {e}")
+                    raise QueryTimeoutError(f"Query exceeded {budget_ms} ms budget") from e
                 logging.error(f"Database query error (attempt {attempt + 1}): {e}")
                 if attempt == self.config.max_retry_attempts - 1:
                     raise
                 await asyncio.sleep(1)  # Wait before retry
         return None
     
+    async def gather_queries(self, label: str, queries: Dict[str, tuple],
+                             budget: str = 'default') -> Dict[str, Optional[List[Dict[str, Any]]]]:
+        """Run independent (query, params) pairs concurrently over pooled connections"""
+        async def timed(name: str, query: str, params: Optional[tuple]):
+            start = time.perf_counter()
+            result = await self.execute_query(query, params, budget=budget)
+            return name, result, time.perf_counter() - start
+        
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(timed(name, query, params)) for name, (query, params) in queries.items()]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # One query failed (or we were cancelled): stop the siblings and wait until
+            # get_connection has released their pooled connections before re-raising
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        breakdown = ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, _, elapsed in results)
+        logging.info(f"{label} queries finished in {(time.perf_counter() - start) * 1000:.0f} ms ({breakdown})")
+        return {name: result for name, result, _ in results}
+    
+    @staticmethod
+    def _fetch_all(connection: pymysql.Connection, query: str, params: Optional[tuple]) -> List[Dict[str, Any]]:
+        """Blocking query execution, runs on the database executor"""
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    
     async def test_connection(self) -> bool:
         """Test database connectivity"""
         try:
             async with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT 1")
-                    result = cursor.fetchone()
-                    return result is not None
+                result = await self._run(self._fetch_all, conn, "SELECT 1", None)
+                return bool(result)
         except Exception as e:
             logging.error(f"Database connection test failed: {e}")
             return False
@@ -211,6 +432,100 @@ class MessageFormatter:
         """Format datetime for display"""
         return dt.strftime("%Y-%m-%d %H:%M:%S")
 
+# =====================================
+# REPORT DELIVERY SCHEDULER
+# =====================================
+
+class TokenBucket:
+    """Async token bucket shared by all outgoing sends"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class ReportDeliveryScheduler:
+    """Bounded-concurrency, rate-limited message fan-out with per-chat retries"""
+    
+    def __init__(self, bot, config: BotConfig):
+        self.bot = bot
+        self.config = config
+        # Bot API allows roughly 30 messages/second across all chats
+        self.bucket = TokenBucket(config.delivery_rate_per_second)
+    
+    async def deliver(self, chat_ids: List[int], text: str) -> Dict[str, Any]:
+        """Send text to all chats and return delivery metrics"""
+        start = time.monotonic()
+        semaphore = asyncio.Semaphore(self.config.delivery_concurrency)
+        results = await asyncio.gather(*(self._deliver_one(chat_id, text, semaphore) for chat_id in chat_ids))
+        
+        latencies = sorted(result['latency'] for result in results if result['status'] == 'sent')
+        return {
+            'finished_at': datetime.now(),
+            'duration': time.monotonic() - start,
+            'total': len(results),
+            'sent': len(latencies),
+            'failed': [result['chat_id'] for result in results if result['status'] == 'failed'],
+            'unreachable': [result['chat_id'] for result in results if result['status'] == 'unreachable'],
+            'retries': sum(result['attempts'] - 1 for result in results),
+            'latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_max': latencies[-1] if latencies else 0.0,
+        }
+    
+    async def _deliver_one(self, chat_id: int, text: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Send to a single chat, backing off on flood control and transient errors"""
+        start = time.monotonic()
+        result = {'chat_id': chat_id, 'status': 'failed', 'attempts': 0, 'latency': 0.0}
+        
+        for attempt in range(1, self.config.delivery_max_attempts + 1):
+            result['attempts'] = attempt
+            async with semaphore:
+                await self.bucket.acquire()
+                try:
+                    await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=ParseMode.MARKDOWN)
+                    result.update(status='sent', latency=time.monotonic() - start)
+                    return result
+                except RetryAfter as e:
+                    retry_after = e.retry_after
+                    delay = retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+                    logging.warning(f"Flood control for chat {chat_id}, retrying in {delay:.0f}s")
+                except Forbidden as e:
+                    logging.warning(f"Chat {chat_id} is unreachable: {e}")
+                    result['status'] = 'unreachable'
+                    return result
+                except BadRequest as e:
+                    if 'chat not found' in str(e).lower():
+                        result['status'] = 'unreachable'
+                    logging.error(f"Daily report rejected for chat {chat_id}: {e}")
+                    return result
+                except NetworkError as e:
+                    delay = min(2 ** attempt, 60)
+                    logging.warning(f"Transient send error for chat {chat_id} (attempt {attempt}): {e}")
+                except TelegramError as e:
+                    logging.error(f"Failed to send daily report to {chat_id}: {e}")
+                    return result
+            
+            # Back off outside the semaphore so other chats keep flowing
+            if attempt < self.config.delivery_max_attempts:
+                await asyncio.sleep(delay)
+        
+        logging.error(f"Giving up on chat {chat_id} after {result['attempts']} attempts")
+        return result
+
 # =====================================
 # BOT COMMANDS HANDLER
 # =====================================
@@ -224,13 +539,38 @@ class LapsusBotHandler:
         self.auth_manager = AuthManager()
         self.formatter = MessageFormatter()
         self.daily_report_enabled = True  # Günlük rapor aktif/pasif
-        self.report_chat_ids = set()  # Rapor alacak chat ID'leri
+        # Rapor alacak chat ID'leri; yeniden başlatmada telafi gönderimi için diskte tutulur
+        self.subscribers_path = os.path.join(config.report_dir, "report_subscribers.json")
+        self.report_chat_ids = self._load_report_subscribers()
+        self._report_artifacts: Dict[str, Dict[str, Any]] = {}  # Tarih -> üretilmiş rapor
+        self._report_lock = asyncio.Lock()
+        self.delivery_scheduler: Optional[ReportDeliveryScheduler] = None
+        self.last_delivery_stats: Optional[Dict[str, Any]] = None
+        # (command, params) -> {'value', 'version', 'stored', 'computed_at'}
+        self._result_cache: Dict[tuple, Dict[str, Any]] = {}
+    
+    def _load_report_subscribers(self) -> set:
+        """Kayıtlı rapor abonelerini oku"""
+        try:
+            with open(self.subscribers_path, encoding='utf-8') as f:
+                return set(json.load(f).get('chat_ids', []))
+        except (OSError, ValueError):
+            return set()
+    
+    def _save_report_subscribers(self):
+        """Rapor abonelerini kaydet"""
+        os.makedirs(self.config.report_dir, exist_ok=True)
+        tmp_path = f"{self.subscribers_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'chat_ids': sorted(self.report_chat_ids)}, f)
+        os.replace(tmp_path, self.subscribers_path)
     
     async def initialize(self) -> bool:
         """Initialize bot and test connections"""
         logging.info("Initializing Lapsus Bot...")
         
-        # Test database connection
+        # Pre-open pooled connections and test database connection
+        await self.db_manager.warm_pool()
         if not await self.db_manager.test_connection():
             logging.error("Database connection failed during initialization")
             return False
@@ -293,6 +633,46 @@ class LapsusBotHandler:
             parse_mode=ParseMode.MARKDOWN
         )
     
+    async def _data_version(self) -> Optional[int]:
+        """Version stamp of the aggregate data: rollup high-water mark on accs.id.
+        
+        It moves whenever new accs rows land in the rollup tables the commands read.
+        """
+        try:
+            result = await self.db_manager.execute_query(
+                "SELECT last_id FROM rollup_state WHERE name = %s", ('accs_rollup',)
+            )
+            return result[0]['last_id'] if result else None
+        except Exception as e:
+            logging.warning(f"Data version probe failed: {e}")
+            return None
+    
+    async def _cached_result(self, command: str, params: tuple, compute):
+        """Return (value, computed_at, from_cache) using TTL + version-stamped cache"""
+        version = await self._data_version()
+        key = (command, params)
+        entry = self._result_cache.get(key)
+        
+        if (entry and version is not None and entry['version'] == version
+                and time.monotonic() - entry['stored'] < self.config.stats_cache_ttl):
+            return entry['value'], entry['computed_at'], True
+        
+        value = await compute()
+        computed_at = datetime.now()
+        self._result_cache[key] = {
+            'value': value,
+            'version': version,
+            'stored': time.monotonic(),
+            'computed_at': computed_at,
+        }
+        return value, computed_at, False
+    
+    def _freshness_note(self, computed_at: datetime, from_cache: bool) -> str:
+        """Human readable data freshness line"""
+        age = int((datetime.now() - computed_at).total_seconds())
+        source = f"cached, {age}s old" if from_cache else "live"
+        return f"🕒 **Data as of:** `{self.formatter.format_datetime(computed_at)}` ({source})"
+    
     async def _track_command_usage(self, update: Update, command: str):
         """Track command usage for analytics"""
         user_id = update.effective_user.id
@@ -328,7 +708,7 @@ class LapsusBotHandler:
 • `/domainkontrol <domain>` - Exact domain match
 
 📊 **Daily Report System:**
-• `/gunlukrapor` - Get daily report manually
+• `/gunlukrapor [yenile]` - Get daily report (yenile: regenerate)
 • `/raporabone` - Subscribe to daily reports (00:00)
 • `/raporiptal` - Unsubscribe from daily reports
 • `/raporayarlari` - Report settings & info
@@ -337,6 +717,7 @@ class LapsusBotHandler:
 • `/debug` - System diagnostics & data analysis
 • `/status` - Bot & database status
 • `/sessions` - Active user sessions
+• `/sorgubutce [command] [ms]` - Query time budgets
 • `/help` - This help menu
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -362,6 +743,7 @@ class LapsusBotHandler:
         db_status = "🟢 Connected" if await self.db_manager.test_connection() else "🔴 Disconnected"
         
         # Get system info
+        pool_status = self.db_manager.get_pool_status()
         active_sessions = len(self.auth_manager.get_active_sessions())
         current_time = self.formatter.format_datetime(datetime.now())
         
@@ -383,100 +765,142 @@ class LapsusBotHandler:
 • Database: `{self.config.db_name}`
 • Timeout: {self.config.connection_timeout}s
 • Max Retries: {self.config.max_retry_attempts}
+• Query Timeouts: {sum(self.db_manager.timeout_counters.values())}
+• Pool: {pool_status['idle']}/{pool_status['open']} idle (size {pool_status['size']})
+• Avg Acquire: {pool_status['avg_acquire_ms']:.1f} ms (max {pool_status['max_acquire_ms']:.1f} ms)
         """
         
         await update.message.reply_text(status_msg, parse_mode=ParseMode.MARKDOWN)
     
+    async def cmd_query_budgets(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show or adjust per-command query budgets"""
+        if not self._check_auth(update.effective_user.id):
+            return await self._unauthorized_response(update)
+        
+        await self._track_command_usage(update, "query_budgets")
+        
+        if len(context.args) == 2:
+            try:
+                self.db_manager.set_budget(context.args[0], int(context.args[1]))
+            except ValueError:
+                await update.message.reply_text(
+                    "❌ **Invalid Budget**\n\nUsage: `/sorgubutce <command> <ms>`",
+                    parse_mode=ParseMode.MARKDOWN
+                )
+                return
+        
+        budgets_text = "⏱️ **Query Budgets**\n\n"
+        for name, budget_ms in self.db_manager.query_budgets.items():
+            timeouts = self.db_manager.timeout_counters.get(name, 0)
+            budgets_text += f"• `{name}`: {self.formatter.format_number(budget_ms)} ms ({timeouts} timeouts)\n"
+        budgets_text += "\nUsage: `/sorgubutce <command> <ms>`"
+        
+        await update.message.reply_text(budgets_text, parse_mode=ParseMode.MARKDOWN)
+    
     # =====================================
     # DAILY REPORT SYSTEM
     # =====================================
     
-    async def generate_daily_report(self) -> str:
-        """Günlük detaylı rapor oluştur"""
-        try:
-            yesterday = datetime.now() - timedelta(days=1)
-            yesterday_str = yesterday.strftime('%Y-%m-%d')
-            
+    async def collect_daily_report_data(self, report_date: datetime) -> Dict[str, Any]:
+        """Günlük rapor için yapılandırılmış (JSON uyumlu) veriyi topla"""
+        report_str = report_date.strftime('%Y-%m-%d')
+        
+        # Tüm sayımlar data/rollup.py'nin güncellediği özet tablolardan okunur.
+        # Sorgular birbirinden bağımsızdır ve aynı anda çalışır; yüzdeler sayımlar
+        # geldikten sonra istemci tarafında hesaplanır.
+        queries = {
             # Dün eklenen toplam kayıt
-            daily_query = "SELECT COUNT(*) as daily_count FROM accs WHERE DATE(date) = %s"
-            daily_result = await self.db_manager.execute_query(daily_query, (yesterday_str,))
-            daily_count = daily_result[0]['daily_count'] if daily_result else 0
-            
+            'daily': ("""
+                SELECT CAST(COALESCE(SUM(count), 0) AS SIGNED) as daily_count 
+                FROM accs_hourly_rollup 
+                WHERE day = %s
+            """, (report_str,)),
             # Dün eklenen kayıtların bölgelere göre dağılımı
-            regions_query = """
+            'regions': ("""
                 SELECT 
-                    COALESCE(region, 'Unspecified') as region, 
-                    COUNT(*) as count,
-                    ROUND((COUNT(*) * 100.0 / %s), 2) as percentage
-                FROM accs 
-                WHERE DATE(date) = %s
+                    COALESCE(NULLIF(region, ''), 'Unspecified') as region, 
+                    CAST(SUM(count) AS SIGNED) as count
+                FROM accs_daily_rollup 
+                WHERE day = %s
                 GROUP BY region 
                 ORDER BY count DESC 
                 LIMIT 10
-            """
-            regions_result = await self.db_manager.execute_query(regions_query, (daily_count, yesterday_str))
-            
+            """, (report_str,)),
             # Dün eklenen kayıtların domainlere göre dağılımı
-            domains_query = """
+            'domains': ("""
                 SELECT 
                     domain, 
-                    COUNT(*) as count,
-                    ROUND((COUNT(*) * 100.0 / %s), 2) as percentage
-                FROM accs 
-                WHERE DATE(date) = %s AND domain IS NOT NULL AND domain != ''
+                    CAST(SUM(count) AS SIGNED) as count
+                FROM accs_daily_rollup 
+                WHERE day = %s AND domain != ''
                 GROUP BY domain 
                 ORDER BY count DESC 
                 LIMIT 10
-            """
-            domains_result = await self.db_manager.execute_query(domains_query, (daily_count, yesterday_str))
-            
+            """, (report_str,)),
             # Dün eklenen kayıtların saatlik dağılımı
-            hourly_query = """
+            'hourly': ("""
                 SELECT 
-                    HOUR(date) as hour,
-                    COUNT(*) as count
-                FROM accs 
-                WHERE DATE(date) = %s
-                GROUP BY HOUR(date)
+                    hour,
+                    count
+                FROM accs_hourly_rollup 
+                WHERE day = %s
                 ORDER BY hour
-            """
-            hourly_result = await self.db_manager.execute_query(hourly_query, (yesterday_str,))
-            
+            """, (report_str,)),
             # Kaynak dağılımı
-            sources_query = """
+            'sources': ("""
                 SELECT 
                     COALESCE(NULLIF(source, ''), 'Unspecified') as source,
-                    COUNT(*) as count,
-                    ROUND((COUNT(*) * 100.0 / %s), 2) as percentage
-                FROM accs 
-                WHERE DATE(date) = %s
+                    CAST(SUM(count) AS SIGNED) as count
+                FROM accs_daily_rollup 
+                WHERE day = %s
                 GROUP BY source 
                 ORDER BY count DESC 
                 LIMIT 5
-            """
-            sources_result = await self.db_manager.execute_query(sources_query, (daily_count, yesterday_str))
-            
+            """, (report_str,)),
             # Genel istatistikler
-            total_query = "SELECT COUNT(*) as total FROM accs"
-            total_result = await self.db_manager.execute_query(total_query)
-            total_count = total_result[0]['total'] if total_result else 0
-            
+            'total': ("SELECT CAST(COALESCE(SUM(count), 0) AS SIGNED) as total FROM accs_hourly_rollup", None),
             # Son 7 günün karşılaştırması
-            week_comparison_query = """
+            'week': ("""
                 SELECT 
-                    DATE(date) as date,
-                    COUNT(*) as count
-                FROM accs 
-                WHERE DATE(date) >= %s - INTERVAL 6 DAY AND DATE(date) <= %s
-                GROUP BY DATE(date)
-                ORDER BY date DESC
-            """
-            week_result = await self.db_manager.execute_query(week_comparison_query, (yesterday_str, yesterday_str))
-            
-            # Rapor metni oluştur
-            report = f"""
-📊 **GÜNLÜK RAPOR - {yesterday_str}**
-📅 **{yesterday.strftime('%A, %d %B %Y')}**
+                    day as date,
+                    CAST(SUM(count) AS SIGNED) as count
+                FROM accs_hourly_rollup 
+                WHERE day >= %s - INTERVAL 6 DAY AND day <= %s
+                GROUP BY day
+                ORDER BY day DESC
+            """, (report_str, report_str)),
+        }
+        results = await self.db_manager.gather_queries("Daily report", queries, budget='daily_report')
+        
+        return {
+            'date': report_str,
+            'daily_count': results['daily'][0]['daily_count'] if results['daily'] else 0,
+            'total_count': results['total'][0]['total'] if results['total'] else 0,
+            'regions': results['regions'] or [],
+            'domains': results['domains'] or [],
+            'hourly': results['hourly'] or [],
+            'sources': results['sources'] or [],
+            'week': [
+                {'date': row['date'].strftime('%Y-%m-%d'), 'count': row['count']}
+                for row in results['week'] or []
+            ],
+        }
+    
+    def render_daily_report(self, data: Dict[str, Any], generated_at: datetime) -> str:
+        """Yapılandırılmış rapor verisinden Markdown metni oluştur"""
+        report_date = datetime.strptime(data['date'], '%Y-%m-%d')
+        daily_count = data['daily_count']
+        total_count = data['total_count']
+        regions_result = data['regions']
+        domains_result = data['domains']
+        hourly_result = data['hourly']
+        sources_result = data['sources']
+        week_result = data['week']
+        
+        # Rapor metni oluştur
+        report = f"""
+📊 **GÜNLÜK RAPOR - {data['date']}**
+📅 **{report_date.strftime('%A, %d %B %Y')}**
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -486,87 +910,178 @@ class LapsusBotHandler:
 • Günlük Oran: **{self.formatter.format_percentage(daily_count, total_count)}**
 
 """
+        
+        if daily_count > 0:
+            # Bölgesel dağılım
+            if regions_result:
+                report += "🌍 **BÖLGESEL DAĞILIM:**\n"
+                for i, row in enumerate(regions_result[:5], 1):
+                    region_flag = self._get_region_flag(row['region'])
+                    report += f"{i}. {region_flag} **{row['region']}**: {self.formatter.format_number(row['count'])} ({self.formatter.format_percentage(row['count'], daily_count)})\n"
+                report += "\n"
             
-            if daily_count > 0:
-                # Bölgesel dağılım
-                if regions_result:
-                    report += "🌍 **BÖLGESEL DAĞILIM:**\n"
-                    for i, row in enumerate(regions_result[:5], 1):
-                        region_flag = self._get_region_flag(row['region'])
-                        report += f"{i}. {region_flag} **{row['region']}**: {self.formatter.format_number(row['count'])} ({row['percentage']}%)\n"
-                    report += "\n"
-                
-                # Domain dağılımı
-                if domains_result:
-                    report += "🌐 **POPÜLER DOMAINLER:**\n"
-                    for i, row in enumerate(domains_result[:5], 1):
-                        domain_emoji = self._get_domain_emoji(row['domain'])
-                        report += f"{i}. {domain_emoji} **{row['domain']}**: {self.formatter.format_number(row['count'])} ({row['percentage']}%)\n"
-                    report += "\n"
-                
-                # Saatlik aktivite (sadece aktif saatler)
-                if hourly_result:
-                    peak_hours = sorted(hourly_result, key=lambda x: x['count'], reverse=True)[:3]
-                    if peak_hours:
-                        report += "⏰ **EN AKTİF SAATLER:**\n"
-                        for i, hour_data in enumerate(peak_hours, 1):
-                            hour = hour_data['hour']
-                            count = hour_data['count']
-                            percentage = self.formatter.format_percentage(count, daily_count)
-                            report += f"{i}. **{hour:02d}:00-{hour+1:02d}:00**: {self.formatter.format_number(count)} ({percentage})\n"
-                        report += "\n"
-                
-                # Kaynak dağılımı
-                if sources_result:
-                    report += "🔗 **KAYNAK DAĞILIMI:**\n"
-                    for i, row in enumerate(sources_result, 1):
-                        source_emoji = self._get_source_emoji(row['source'])
-                        report += f"{i}. {source_emoji} **{row['source']}**: {self.formatter.format_number(row['count'])} ({row['percentage']}%)\n"
+            # Domain dağılımı
+            if domains_result:
+                report += "🌐 **POPÜLER DOMAINLER:**\n"
+                for i, row in enumerate(domains_result[:5], 1):
+                    domain_emoji = self._get_domain_emoji(row['domain'])
+                    report += f"{i}. {domain_emoji} **{row['domain']}**: {self.formatter.format_number(row['count'])} ({self.formatter.format_percentage(row['count'], daily_count)})\n"
+                report += "\n"
+            
+            # Saatlik aktivite (sadece aktif saatler)
+            if hourly_result:
+                peak_hours = sorted(hourly_result, key=lambda x: x['count'], reverse=True)[:3]
+                if peak_hours:
+                    report += "⏰ **EN AKTİF SAATLER:**\n"
+                    for i, hour_data in enumerate(peak_hours, 1):
+                        hour = hour_data['hour']
+                        count = hour_data['count']
+                        percentage = self.formatter.format_percentage(count, daily_count)
+                        report += f"{i}. **{hour:02d}:00-{hour+1:02d}:00**: {self.formatter.format_number(count)} ({percentage})\n"
                     report += "\n"
             
-            # Haftalık trend
-            if week_result and len(week_result) > 1:
-                report += "📊 **7 GÜNLÜK TREND:**\n"
-                week_total = sum(row['count'] for row in week_result)
-                week_avg = week_total / len(week_result)
+            # Kaynak dağılımı
+            if sources_result:
+                report += "🔗 **KAYNAK DAĞILIMI:**\n"
+                for i, row in enumerate(sources_result, 1):
+                    source_emoji = self._get_source_emoji(row['source'])
+                    report += f"{i}. {source_emoji} **{row['source']}**: {self.formatter.format_number(row['count'])} ({self.formatter.format_percentage(row['count'], daily_count)})\n"
+                report += "\n"
+        
+        # Haftalık trend
+        if week_result and len(week_result) > 1:
+            report += "📊 **7 GÜNLÜK TREND:**\n"
+            week_total = sum(row['count'] for row in week_result)
+            week_avg = week_total / len(week_result)
+            
+            for row in week_result:
+                date = row['date']
+                count = row['count']
+                day_name = datetime.strptime(date, '%Y-%m-%d').strftime("%a")
                 
-                for row in week_result:
-                    date = row['date']
-                    count = row['count']
-                    day_name = date.strftime("%a")
-                    
-                    # Trend göstergesi
-                    if count > week_avg * 1.2:
-                        trend = "📈"
-                    elif count < week_avg * 0.8:
-                        trend = "📉"
-                    else:
-                        trend = "➡️"
-                    
-                    report += f"• {date} ({day_name}): {trend} **{self.formatter.format_number(count)}**\n"
+                # Trend göstergesi
+                if count > week_avg * 1.2:
+                    trend = "📈"
+                elif count < week_avg * 0.8:
+                    trend = "📉"
+                else:
+                    trend = "➡️"
                 
-                report += f"\nHaftalık Ortalama: **{self.formatter.format_number(int(week_avg))}**\n"
-            
-            # Performans değerlendirmesi
-            report += "\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+                report += f"• {date} ({day_name}): {trend} **{self.formatter.format_number(count)}**\n"
             
-            if daily_count == 0:
-                report += "⚠️ **UYARI**: Dün hiç kayıt eklenmedi!\n"
-            elif week_result:
-                week_avg = sum(row['count'] for row in week_result) / len(week_result)
-                if daily_count > week_avg * 1.5:
-                    report += "🚀 **MÜKEMMEL**: Haftalık ortalamanın üzerinde!\n"
-                elif daily_count > week_avg:
-                    report += "✅ **İYİ**: Ortalamanın üzerinde performans\n"
-                elif daily_count < week_avg * 0.5:
-                    report += "🔴 **DİKKAT**: Ortalamanın çok altında!\n"
-                else:
-                    report += "⚡ **NORMAL**: Haftalık ortalama seviyesinde\n"
+            report += f"\nHaftalık Ortalama: **{self.formatter.format_number(int(week_avg))}**\n"
+        
+        # Performans değerlendirmesi
+        report += "\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        
+        if daily_count == 0:
+            report += "⚠️ **UYARI**: Dün hiç kayıt eklenmedi!\n"
+        elif week_result:
+            week_avg = sum(row['count'] for row in week_result) / len(week_result)
+            if daily_count > week_avg * 1.5:
+                report += "🚀 **MÜKEMMEL**: Haftalık ortalamanın üzerinde!\n"
+            elif daily_count > week_avg:
+                report += "✅ **İYİ**: Ortalamanın üzerinde performans\n"
+            elif daily_count < week_avg * 0.5:
+                report += "🔴 **DİKKAT**: Ortalamanın çok altında!\n"
+            else:
+                report += "⚡ **NORMAL**: Haftalık ortalama seviyesinde\n"
+        
+        report += f"\n🕐 **Rapor Zamanı**: {self.formatter.format_datetime(generated_at)}\n"
+        report += "🤖 **Lapsus Database Manager v2.0.1**"
+        
+        return report
+    
+    def _report_artifact_path(self, report_str: str) -> str:
+        """Rapor artefaktının JSON dosya yolu"""
+        return os.path.join(self.config.report_dir, f"daily_report_{report_str}.json")
+    
+    def _load_report_artifact(self, report_str: str) -> Optional[Dict[str, Any]]:
+        """Diskteki rapor artefaktını yükle"""
+        path = self._report_artifact_path(report_str)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Daily report artifact could not be read ({path}): {e}")
+            return None
+    
+    def _save_report_artifact(self, artifact: Dict[str, Any]):
+        """Artefaktı JSON ve Markdown olarak atomik şekilde yaz"""
+        os.makedirs(self.config.report_dir, exist_ok=True)
+        json_path = self._report_artifact_path(artifact['date'])
+        outputs = [
+            (json_path, json.dumps(artifact, ensure_ascii=False, indent=2)),
+            (json_path[:-len('.json')] + '.md', artifact['markdown']),
+        ]
+        for path, content in outputs:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+    
+    async def _report_day_end_id(self) -> Optional[int]:
+        """Raporlanan gün bittikten sonra ölçülen en büyük accs.id (günün tüm satırları bunun altında)"""
+        try:
+            result = await self.db_manager.execute_query("SELECT MAX(id) as max_id FROM accs")
+            return result[0]['max_id'] if result else None
+        except Exception as e:
+            logging.warning(f"accs high-water probe failed: {e}")
+            return None
+    
+    async def _report_is_stale(self, artifact: Dict[str, Any]) -> bool:
+        """Eksik üretilmiş artefakt, özet tabloları o zamandan beri ilerlediyse yeniden üretilir"""
+        if artifact.get('complete', True):
+            return False
+        version = await self._data_version()
+        return version is not None and version != artifact.get('rollup_last_id')
+    
+    async def build_daily_report(self, report_date: datetime, regenerate: bool = False) -> Dict[str, Any]:
+        """Günün rapor artefaktını döndür; yoksa, istenirse veya eksikken özetler ilerlediyse yeniden üret.
+        
+        Özet tabloları accs'in gerisinden gelir (settle süresi + refresh aralığı); gece
+        yarısı üretilen rapor günün son dakikalarını içermeyebilir. Artefakt hangi
+        rollup_state.last_id ile üretildiğini ve günün sonundaki accs.id'yi tutar;
+        özetler o id'yi geçene kadar eksik (complete=False) sayılır.
+        """
+        report_str = report_date.strftime('%Y-%m-%d')
+        
+        async with self._report_lock:
+            artifact = self._report_artifacts.get(report_str) or self._load_report_artifact(report_str)
+            if artifact and not regenerate and not await self._report_is_stale(artifact):
+                self._report_artifacts[report_str] = artifact
+                return artifact
             
-            report += f"\n🕐 **Rapor Zamanı**: {self.formatter.format_datetime(datetime.now())}\n"
-            report += "🤖 **Lapsus Database Manager v2.0.1**"
+            # Gün sonu id'si ilk üretimde ölçülür, sonraki yeniden üretimlerde korunur
+            day_end_id = artifact.get('day_end_id') if artifact else None
+            if day_end_id is None:
+                day_end_id = await self._report_day_end_id()
+            rollup_last_id = await self._data_version()
             
-            return report
+            data = await self.collect_daily_report_data(report_date)
+            generated_at = datetime.now()
+            artifact = {
+                'date': report_str,
+                'generated_at': generated_at.isoformat(),
+                'rollup_last_id': rollup_last_id,
+                'day_end_id': day_end_id,
+                'complete': rollup_last_id is not None and (day_end_id is None or rollup_last_id >= day_end_id),
+                'data': data,
+                'markdown': self.render_daily_report(data, generated_at),
+            }
+            self._save_report_artifact(artifact)
+            self._report_artifacts = {report_str: artifact}
+            logging.info(f"Daily report artifact generated for {report_str}")
+            return artifact
+    
+    async def generate_daily_report(self, regenerate: bool = False) -> str:
+        """Dünün raporunu artefakttan döndür"""
+        try:
+            yesterday = datetime.now() - timedelta(days=1)
+            artifact = await self.build_daily_report(yesterday, regenerate=regenerate)
+            return artifact['markdown']
             
         except Exception as e:
             logging.error(f"Daily report generation error: {e}")
@@ -624,33 +1139,49 @@ class LapsusBotHandler:
         else:
             return '📂'
     
-    async def send_daily_report_to_subscribers(self):
-        """Günlük raporu abone olan kullanıcılara gönder"""
+    async def send_daily_report_to_subscribers(self, chat_ids: Optional[List[int]] = None) -> Optional[List[int]]:
+        """Günlük raporu abone olan kullanıcılara (ya da verilen chat'lere) gönder.
+        
+        Rapor üretilemezse hata yükseltilir; gönderilemeyen (geçici hata) chat'lerin
+        listesi döndürülür ki çağıran yalnızca onları tekrar denesin. Gönderilecek
+        hedef yoksa None döner.
+        """
         if not self.daily_report_enabled or not hasattr(self, 'application') or not self.application:
-            return
+            return None
         
-        try:
-            report = await self.generate_daily_report()
-            
-            if self.report_chat_ids:
-                for chat_id in self.report_chat_ids.copy():  # Copy to avoid modification during iteration
-                    try:
-                        await self.application.bot.send_message(
-                            chat_id=chat_id, 
-                            text=report, 
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                        logging.info(f"Daily report sent to chat {chat_id}")
-                        await asyncio.sleep(1)  # Rate limiting
-                    except Exception as e:
-                        logging.error(f"Failed to send daily report to {chat_id}: {e}")
-                        # Hatalı chat ID'yi kaldır
-                        self.report_chat_ids.discard(chat_id)
-            else:
-                logging.info("No subscribers for daily report")
-                
-        except Exception as e:
-            logging.error(f"Error sending daily reports: {e}")
+        targets = list(self.report_chat_ids) if chat_ids is None else [c for c in chat_ids if c in self.report_chat_ids]
+        if not targets:
+            logging.info("No subscribers for daily report")
+            return None
+        
+        # Hata mesajı yerine istisna: veritabanı kesintisinde abonelere hata metni gitmez
+        yesterday = datetime.now() - timedelta(days=1)
+        artifact = await self.build_daily_report(yesterday)
+        # Özetler günü kapsayana kadar gönderim ertelenir (scheduler 5 dakikada bir dener);
+        # bekleme süresi aşılırsa eldeki rapor gönderilir
+        midnight = datetime.combine(datetime.now().date(), datetime.min.time())
+        if not artifact.get('complete', True) and (datetime.now() - midnight).total_seconds() < self.config.report_completion_wait:
+            raise RuntimeError(f"Rollup has not covered {artifact['date']} yet "
+                               f"(last_id {artifact['rollup_last_id']} < {artifact['day_end_id']})")
+        report = artifact['markdown']
+        
+        if self.delivery_scheduler is None:
+            self.delivery_scheduler = ReportDeliveryScheduler(self.application.bot, self.config)
+        
+        stats = await self.delivery_scheduler.deliver(targets, report)
+        self.last_delivery_stats = stats
+        
+        # Yalnızca kalıcı olarak ulaşılamayan chat'ler abonelikten çıkarılır
+        if stats['unreachable']:
+            self.report_chat_ids.difference_update(stats['unreachable'])
+            self._save_report_subscribers()
+        
+        logging.info(
+            f"Daily report delivered to {stats['sent']}/{stats['total']} chats in {stats['duration']:.1f}s "
+            f"(avg latency {stats['latency_avg']:.2f}s, max {stats['latency_max']:.2f}s, "
+            f"retries {stats['retries']}, failed {len(stats['failed'])}, unreachable {len(stats['unreachable'])})"
+        )
+        return stats['failed']
     
     async def cmd_daily_report(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Manuel günlük rapor komutu"""
@@ -660,11 +1191,14 @@ class LapsusBotHandler:
         await self._track_command_usage(update, "daily_report")
         
         try:
+            # "/gunlukrapor yenile" raporu veritabanından yeniden üretir
+            regenerate = bool(context.args) and context.args[0].lower() in ('yenile', 'refresh')
+            
             # Loading mesajı gönder
             loading_msg = await update.message.reply_text("📊 **Günlük rapor hazırlanıyor...**", parse_mode=ParseMode.MARKDOWN)
             
-            # Raporu oluştur
-            report = await self.generate_daily_report()
+            # Raporu artefakttan al (gerekirse oluştur)
+            report = await self.generate_daily_report(regenerate=regenerate)
             
             # Loading mesajını sil ve raporu gönder
             await loading_msg.delete()
@@ -693,6 +1227,7 @@ class LapsusBotHandler:
             )
         else:
             self.report_chat_ids.add(chat_id)
+            self._save_report_subscribers()
             await update.message.reply_text(
                 "🔔 **Abonelik Başarılı!**\n\n"
                 "Bu chat artık her gece saat 00:00'da günlük rapor alacak.\n\n"
@@ -712,6 +1247,7 @@ class LapsusBotHandler:
         
         if chat_id in self.report_chat_ids:
             self.report_chat_ids.remove(chat_id)
+            self._save_report_subscribers()
             await update.message.reply_text(
                 "🔕 **Abonelik İptal Edildi**\n\nBu chat artık günlük rapor almayacak.",
                 parse_mode=ParseMode.MARKDOWN
@@ -733,6 +1269,15 @@ class LapsusBotHandler:
         chat_id = update.effective_chat.id
         is_subscribed = chat_id in self.report_chat_ids
         
+        stats = self.last_delivery_stats
+        if stats:
+            last_delivery = (
+                f"{self.formatter.format_datetime(stats['finished_at'])} - "
+                f"{stats['sent']}/{stats['total']} chat, {stats['duration']:.1f}s"
+            )
+        else:
+            last_delivery = "Henüz gönderim yapılmadı"
+        
         settings_text = f"""
 📊 **Günlük Rapor Ayarları**
 
@@ -741,12 +1286,14 @@ class LapsusBotHandler:
 🔔 **Abonelik Durumu:** {"✅ Aktif" if is_subscribed else "❌ Pasif"}
 ⏰ **Rapor Zamanı:** Her gece 00:00
 📱 **Toplam Abone:** {len(self.report_chat_ids)} chat
+📬 **Son Gönderim:** {last_delivery}
 🤖 **Sistem Durumu:** {"🟢 Aktif" if self.daily_report_enabled else "🔴 Pasif"}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 📋 **Kullanılabilir Komutlar:**
 • `/gunlukrapor` - Manuel rapor al
+• `/gunlukrapor yenile` - Raporu yeniden oluştur
 • `/raporabone` - Otomatik rapora abone ol
 • `/raporiptal` - Abonelikten çık
 • `/raporayarlari` - Bu menü
@@ -769,13 +1316,22 @@ class LapsusBotHandler:
         
         try:
             # Get comprehensive statistics
-            total_query = "SELECT COUNT(*) as total FROM accs"
-            today_query = "SELECT COUNT(*) as today_total FROM accs WHERE DATE(date) = CURDATE()"
-            week_query = "SELECT COUNT(*) as week_total FROM accs WHERE DATE(date) >= CURDATE() - INTERVAL 7 DAY"
+            total_query = "SELECT CAST(COALESCE(SUM(count), 0) AS SIGNED) as total FROM accs_hourly_rollup"
+            today_query = "SELECT CAST(COALESCE(SUM(count), 0) AS SIGNED) as today_total FROM accs_hourly_rollup WHERE day = CURDATE()"
+            week_query = "SELECT CAST(COALESCE(SUM(count), 0) AS SIGNED) as week_total FROM accs_hourly_rollup WHERE day >= CURDATE() - INTERVAL 7 DAY"
+            
+            async def compute():
+                return await self.db_manager.gather_queries("Statistics", {
+                    'total': (total_query, None),
+                    'today': (today_query, None),
+                    'week': (week_query, None),
+                }, budget='statistics')
             
-            total_result = await self.db_manager.execute_query(total_query)
-            today_result = await self.db_manager.execute_query(today_query)
-            week_result = await self.db_manager.execute_query(week_query)
+            # CURDATE() based counts: cache key includes the date
+            results, computed_at, from_cache = await self._cached_result(
+                'statistics', (datetime.now().date().isoformat(),), compute
+            )
+            total_result, today_result, week_result = results['total'], results['today'], results['week']
             
             if not all([total_result, today_result, week_result]):
                 raise Exception("Failed to fetch statistics")
@@ -788,7 +1344,7 @@ class LapsusBotHandler:
             today_pct = self.formatter.format_percentage(today, total)
             week_pct = self.formatter.format_percentage(week, total)
             
-            current_time = self.formatter.format_datetime(datetime.now())
+            freshness = self._freshness_note(computed_at, from_cache)
             
             stats_msg = f"""
 📊 **Database Analytics Report**
@@ -803,7 +1359,7 @@ class LapsusBotHandler:
 • Today: **{self.formatter.format_number(today)}** ({today_pct})
 • Last 7 Days: **{self.formatter.format_number(week)}** ({week_pct})
 
-🕒 **Generated:** `{current_time}`
+{freshness}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -812,6 +1368,11 @@ class LapsusBotHandler:
             
             await update.message.reply_text(stats_msg, parse_mode=ParseMode.MARKDOWN)
             
+        except QueryTimeoutError:
+            await update.message.reply_text(
+                "⏱️ **Timeout**\n\nStatistics query exceeded its time budget. Please try again later.",
+                parse_mode=ParseMode.MARKDOWN
+            )
         except Exception as e:
             logging.error(f"Statistics command error: {e}")
             await update.message.reply_text(
@@ -829,15 +1390,17 @@ class LapsusBotHandler:
         try:
             query = """
                 SELECT 
-                    COALESCE(region, 'Unspecified') as region, 
-                    COUNT(*) AS count
-                FROM accs 
+                    COALESCE(NULLIF(region, ''), 'Unspecified') as region, 
+                    CAST(SUM(count) AS SIGNED) AS count
+                FROM accs_daily_rollup 
                 GROUP BY region 
                 ORDER BY count DESC 
                 LIMIT 10
             """
             
-            result = await self.db_manager.execute_query(query)
+            result, computed_at, from_cache = await self._cached_result(
+                'regions', (), lambda: self.db_manager.execute_query(query, budget='regions')
+            )
             
             if not result:
                 await update.message.reply_text("📍 **Regional Analysis**\n\nNo regional data found.", parse_mode=ParseMode.MARKDOWN)
@@ -850,8 +1413,12 @@ class LapsusBotHandler:
                 count = self.formatter.format_number(row['count'])
                 regions_text += f"{i:2d}. **{region}**: {count}\n"
             
+            regions_text += f"\n{self._freshness_note(computed_at, from_cache)}"
+            
             await update.message.reply_text(regions_text, parse_mode=ParseMode.MARKDOWN)
             
+        except QueryTimeoutError:
+            await update.message.reply_text("⏱️ **Timeout**\n\nRegional query exceeded its time budget.", parse_mode=ParseMode.MARKDOWN)
         except Exception as e:
             logging.error(f"Regions command error: {e}")
             await update.message.reply_text("❌ **Error**\n\nFailed to retrieve regional data.", parse_mode=ParseMode.MARKDOWN)
@@ -887,50 +1454,84 @@ class LapsusBotApplication:
         self.config = Config.load_from_env()
         self.handler = LapsusBotHandler(self.config)
         self.application: Optional[Application] = None
-        self.scheduler_thread = None
-        self.scheduler_running = False
-    
-    def setup_daily_scheduler(self):
-        """Günlük rapor scheduler'ını ayarla"""
-        def run_scheduler():
-            while self.scheduler_running:
-                schedule.run_pending()
-                time.sleep(30)  # Her 30 saniyede bir kontrol et
-        
-        def daily_report_job():
-            """Scheduler job function"""
-            if self.application and hasattr(self.handler, 'send_daily_report_to_subscribers'):
+        self.scheduler_task: Optional[asyncio.Task] = None
+        self.scheduler_state_path = os.path.join(self.config.report_dir, "scheduler_state.json")
+    
+    def _load_last_report_run(self) -> Optional[str]:
+        """Son başarılı günlük rapor çalıştırmasının tarihini oku"""
+        try:
+            with open(self.scheduler_state_path, encoding='utf-8') as f:
+                return json.load(f).get('daily_report_last_run')
+        except (OSError, ValueError):
+            return None
+    
+    def _save_last_report_run(self, run_date: str):
+        """Son başarılı çalıştırma tarihini kaydet (yeniden başlatmada telafi için)"""
+        os.makedirs(self.config.report_dir, exist_ok=True)
+        tmp_path = f"{self.scheduler_state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'daily_report_last_run': run_date}, f)
+        os.replace(tmp_path, self.scheduler_state_path)
+    
+    async def daily_report_scheduler(self):
+        """Her gece 00:00'da günlük raporu bot'un kendi event loop'unda gönder.
+        
+        Bugünün çalıştırması kaydedilmemişse (ör. bot gece yarısı kapalıysa)
+        başlangıçta hemen telafi edilir. Rapor üretilemezse tüm gönderim, bazı
+        chat'lere gönderilemezse yalnızca onlar 5 dakika sonra tekrar denenir;
+        gün yalnızca başarılı çalıştırmadan sonra tamamlandı olarak kaydedilir.
+        """
+        pending_date = None
+        pending_chats: Optional[List[int]] = None
+        delivery_attempts = 0
+        
+        while True:
+            today = datetime.now().date().isoformat()
+            if pending_date != today:
+                # Önceki günün bekleyen tekrarları yeni günün raporuyla karışmaz
+                pending_date, pending_chats, delivery_attempts = today, None, 0
+            
+            if self._load_last_report_run() != today:
                 try:
-                    # Async fonksiyonu sync context'te çalıştır
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    loop.run_until_complete(self.handler.send_daily_report_to_subscribers())
-                    loop.close()
+                    logging.info(f"Running daily report job for {today}")
+                    failed = await self.handler.send_daily_report_to_subscribers(pending_chats)
                 except Exception as e:
                     logging.error(f"Daily report scheduler error: {e}")
-        
-        # Her gece 00:00'da çalışacak job'u ayarla
-        schedule.every().day.at("00:00").do(daily_report_job)
-        
-        # Scheduler thread'ini başlat
-        self.scheduler_running = True
-        self.scheduler_thread = Thread(target=run_scheduler, daemon=True)
-        self.scheduler_thread.start()
-        
-        logging.info("✅ Daily report scheduler started (00:00 daily)")
-        
-        # Test için - bir sonraki dakikada da çalışacak şekilde (ilk test için)
-        next_minute = (datetime.now() + timedelta(minutes=1)).strftime("%H:%M")
-        schedule.every().day.at(next_minute).do(daily_report_job).tag('test')
-        
-        logging.info(f"🧪 Test report scheduled for {next_minute} (one-time)")
+                    await asyncio.sleep(300)  # 5 dakika sonra tekrar dene
+                    continue
+                
+                if failed is None and pending_chats is None:
+                    # Hiçbir şey gönderilmediyse gün tamamlandı sayılmaz; abone eklenip
+                    # bot yeniden başlatılırsa telafi gönderimi yapılır
+                    logging.info(f"Daily report for {today} had no targets, not marking it done")
+                else:
+                    if failed:
+                        delivery_attempts += 1
+                        if delivery_attempts < self.config.delivery_retry_rounds:
+                            logging.warning(f"Daily report failed for {len(failed)} chats, retrying them in 5 minutes")
+                            pending_chats = failed
+                            await asyncio.sleep(300)
+                            continue
+                        logging.error(f"Giving up daily report delivery for chats: {failed}")
+                    
+                    self._save_last_report_run(today)
+            
+            next_run = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+            await asyncio.sleep(max((next_run - datetime.now()).total_seconds(), 1))
+    
+    async def _post_init(self, application: Application):
+        """Polling başladıktan sonra scheduler'ı aynı event loop'ta başlat"""
+        self.scheduler_task = asyncio.create_task(self.daily_report_scheduler())
+        logging.info("✅ Daily report scheduler started (00:00 daily, in-loop)")
     
-    def stop_scheduler(self):
+    async def _post_shutdown(self, application: Application):
         """Scheduler'ı durdur"""
-        self.scheduler_running = False
-        if self.scheduler_thread:
-            self.scheduler_thread.join(timeout=5)
-        schedule.clear()
+        if self.scheduler_task:
+            self.scheduler_task.cancel()
+            try:
+                await self.scheduler_task
+            except asyncio.CancelledError:
+                pass
         logging.info("🛑 Daily report scheduler stopped")
     
     def setup_handlers(self):
@@ -943,6 +1544,7 @@ class LapsusBotApplication:
             ("status", self.handler.cmd_status),
             ("istatistik", self.handler.cmd_statistics),
             ("bolgeler", self.handler.cmd_regions),
+            ("sorgubutce", self.handler.cmd_query_budgets),
             # Daily Report Commands
             ("gunlukrapor", self.handler.cmd_daily_report),
             ("raporabone", self.handler.cmd_report_subscribe),
@@ -971,17 +1573,20 @@ class LapsusBotApplication:
                 return False
             
             # Create application
-            self.application = ApplicationBuilder().token(self.config.bot_token).build()
+            self.application = (
+                ApplicationBuilder()
+                .token(self.config.bot_token)
+                .post_init(self._post_init)
+                .post_shutdown(self._post_shutdown)
+                .build()
+            )
             
             # Bot application'ı handler'a bağla (günlük rapor için gerekli)
             self.handler.application = self.application
             
-            # Setup handlers
+            # Setup handlers (günlük rapor scheduler'ı post_init ile başlar)
             self.setup_handlers()
             
-            # Daily report scheduler'ını başlat
-            self.setup_daily_scheduler()
-            
             logging.info("🚀 Lapsus Bot initialized successfully")
             logging.info("🤖 Starting Lapsus Database Manager Bot...")
             logging.info(f"📡 Bot Token: {self.config.bot_token[:20]}...")
@@ -997,7 +1602,7 @@ class LapsusBotApplication:
             return False
         finally:
             logging.info("🔄 Cleaning up resources...")
-            self.stop_scheduler()  # Scheduler'ı durdur
+            self.handler.db_manager.close()
         
         return True
 
@@ -0,0 +1,102 @@
+import re
+
+# Zafiyet kayıtlarından çıkarılan tanımlayıcılar için yan tablolar
+ADVISORY_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS `vulnerability_cves` (
+        `cve_id` varchar(20) NOT NULL,
+        `vulnerability_id` bigint(20) NOT NULL,
+        `cvss_score` decimal(3,1) DEFAULT NULL,
+        PRIMARY KEY (`cve_id`, `vulnerability_id`),
+        INDEX `idx_vulnerability` (`vulnerability_id`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `vulnerability_products` (
+        `vendor` varchar(100) NOT NULL DEFAULT '',
+        `product` varchar(150) NOT NULL DEFAULT '',
+        `vulnerability_id` bigint(20) NOT NULL,
+        PRIMARY KEY (`vendor`, `product`, `vulnerability_id`),
+        INDEX `idx_product` (`product`),
+        INDEX `idx_vulnerability` (`vulnerability_id`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+    """
+]
+
+_CVE_PATTERN = re.compile(r'\bCVE-(\d{4})-(\d{4,7})\b', re.IGNORECASE)
+# "CVSS: 9.8", "CVSS v3.1 Base Score 7.5", "CVSSv3: 8.8"; "CVSS:3.1/AV:N..." vektörü hariç
+_CVSS_PATTERN = re.compile(
+    r'\bCVSS(?:\s*v?[234](?:\.\d)?)?(?:\s*(?:base\s*)?score)?\s*[:=]?\s*(\d{1,2}(?:\.\d)?)(?![\d./])',
+    re.IGNORECASE
+)
+_CPE_PATTERN = re.compile(r'cpe:(?:2\.3:|/)[aho]:([^:\s]+):([^:\s]+)', re.IGNORECASE)
+_VENDOR_LINE = re.compile(r'^\s*(?:vendor|üretici)\s*[:=]\s*(.+?)\s*$', re.IGNORECASE | re.MULTILINE)
+_PRODUCT_LINE = re.compile(r'^\s*(?:affected\s+)?(?:products?|ürün)\s*[:=]\s*(.+?)\s*$',
+                           re.IGNORECASE | re.MULTILINE)
+
+
+def _clean_name(name, max_length):
+    return name.replace('_', ' ').strip().strip('"\'').lower()[:max_length]
+
+
+def extract_advisory_refs(title, content):
+    """Başlık ve içerikten CVE id'leri, CVSS skoru ve (üretici, ürün) çiftlerini çıkar.
+
+    Dönen değer: {"cves": [(cve_id, cvss_score)], "products": [(vendor, product)]}.
+    Metinde birden fazla skor varsa en yükseği tüm CVE'lere yazılır.
+    """
+    text = f"{title or ''}\n{content or ''}"
+
+    cve_ids = sorted({f"CVE-{year}-{number}" for year, number in _CVE_PATTERN.findall(text)})
+
+    scores = [float(score) for score in _CVSS_PATTERN.findall(text) if 0 <= float(score) <= 10]
+    cvss_score = max(scores) if scores else None
+
+    products = set()
+    for vendor, product in _CPE_PATTERN.findall(text):
+        products.add((_clean_name(vendor, 100), _clean_name(product, 150)))
+
+    vendors = [_clean_name(v, 100) for v in _VENDOR_LINE.findall(text)]
+    labelled_products = [_clean_name(p, 150)
+                         for line in _PRODUCT_LINE.findall(text)
+                         for p in line.split(',') if p.strip()]
+    for vendor in vendors or ['']:
+        for product in labelled_products or ['']:
+            if vendor or product:
+                products.add((vendor, product))
+
+    return {
+        "cves": [(cve_id, cvss_score) for cve_id in cve_ids],
+        "products": sorted(products)
+    }
+
+
+def ensure_advisory_schema(conn):
+    cursor = conn.cursor()
+    try:
+        for create_table_query in ADVISORY_TABLES:
+            cursor.execute(create_table_query)
+    finally:
+        cursor.close()
+
+
+def index_advisories(cursor, advisories):
+    """[(vulnerability_id, title, content)] listesini yan tablolara yaz; yazılan ref sayısını döndür"""
+    cve_rows = []
+    product_rows = []
+    for vulnerability_id, title, content in advisories:
+        refs = extract_advisory_refs(title, content)
+        cve_rows.extend((cve_id, vulnerability_id, score) for cve_id, score in refs["cves"])
+        product_rows.extend((vendor, product, vulnerability_id) for vendor, product in refs["products"])
+
+    if cve_rows:
+        cursor.executemany("""
+            INSERT IGNORE INTO vulnerability_cves (cve_id, vulnerability_id, cvss_score)
+            VALUES (%s, %s, %s)
+        """, cve_rows)
+    if product_rows:
+        cursor.executemany("""
+            INSERT IGNORE INTO vulnerability_products (vendor, product, vulnerability_id)
+            VALUES (%s, %s, %s)
+        """, product_rows)
+    return len(cve_rows) + len(product_rows)
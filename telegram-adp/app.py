@@ -2,9 +2,18 @@ from telethon import TelegramClient, events
 import os
 from datetime import datetime
 import asyncio
-import mysql.connector
-import re
 import json
+from concurrent.futures import ThreadPoolExecutor
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+from spool import DiskSpool
+from message_parser import parse_message
+from transcript import TranscriptStore
+from dedup import BloomFilter
+from store import ensure_dedup_schema, ensure_search_indexes, backfill_fingerprints, warm_bloom, write_records
+from advisory import ensure_advisory_schema
+from bodies import ensure_compressed_tables, restore_message_bodies
+from metrics import IngestMetrics, serve_metrics
 
 # Telegram API bilgileri
 api_id = 1234567  # ← kendi api_id'ni yaz
@@ -25,104 +34,357 @@ DB_CONFIG = {
     'password': 'daaqwWdas21as',
     'charset': 'utf8mb4',
     'port': 3306,
-    'autocommit': True
+    'autocommit': True,
+    'connection_timeout': 10
 }
 
-# Dosya kilidi
-file_lock = asyncio.Lock()
+# Toplu yazma ayarları
+WRITE_BATCH_SIZE = 500        # tek executemany'de en fazla kayıt
+WRITE_FLUSH_INTERVAL = 1.0    # ilk kayıttan sonra en fazla bekleme (saniye)
+WRITE_QUEUE_MAXSIZE = 10000   # dolarsa handler bekler (backpressure)
+
+# Ayrıştırılmış kayıtlar: (tablo, değerler, chat_id, mesaj_id, mesaj zamanı epoch, checkpoint'i ilerletir mi)
+write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_MAXSIZE)
+
+# DB çağrıları event loop'u bloklamasın diye tek thread'li executor; bağlantı bu thread'e aittir
+db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+db_connection = None
+db_healthy = True  # False iken yeni kayıtlar doğrudan spool'a yazılır
+
+# MySQL erişilemezken kayıtların bekletildiği yerel spool
+SPOOL_DIR = "spool"
+SPOOL_STATUS_PATH = os.path.join(SPOOL_DIR, "status.json")
+SPOOL_REPLAY_BATCH_SIZE = 5000   # replay sırasında tek executemany'de en fazla kayıt
+SPOOL_REPLAY_INTERVAL = 15       # spool boş ya da DB kapalıyken deneme aralığı (saniye)
+spool = DiskSpool(SPOOL_DIR)
+spool_status = {}  # spool_replayer her turda günceller
+
+# Veri hatası yüzünden hiç yazılamayacak kayıtlar (tip, kolon uzunluğu vb.) tekrar
+# denenmez; ayrı bir dizinde elle incelenmek üzere bekletilir
+QUARANTINE_DIR = os.path.join(SPOOL_DIR, "quarantine")
+quarantine = DiskSpool(QUARANTINE_DIR)
+quarantined_records = 0
+
+# Yalnızca bu hatalar "DB erişilemiyor" sayılır: 2003 bağlanılamadı, 2006 sunucu gitti,
+# 2013 sorgu sırasında bağlantı koptu, 2055 bağlantı sistem hatasıyla kaybedildi
+CONNECTION_ERRNOS = {2003, 2006, 2013, 2055}
 
-# Tarihi parse et
-def parse_date(date_str):
+# Ingest metrikleri - yalnızca yerelden erişilen HTTP endpoint (GET /metrics)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+metrics = IngestMetrics()
+
+# Kanal başına kalıcı olarak yazılmış (DB ya da spool) son mesaj id'si
+CHECKPOINT_PATH = "checkpoints.json"
+checkpoints = {}
+# Geri doldurması bitmiş kanallar; diğerlerinde canlı mesajlar checkpoint'i ilerletmez,
+# yoksa henüz çekilmemiş aradaki mesajların üzerinden atlanmış olur
+caught_up = set()
+# Bir batch'i kalıcı yazılamamış kanallar; bu süreç boyunca checkpoint'leri sabit kalır
+# ve sonraki açılışta boşluk yeniden çekilir
+frozen_checkpoints = set()
+
+# Kanal transcript dosyaları (tamponlu, günlük döndürülür)
+transcripts = TranscriptStore()
+
+# İçerik parmak izi ile tekrar eden mesajların ayıklanması
+DEDUP_BLOOM_CAPACITY = 1000000
+DEDUP_BLOOM_ERROR_RATE = 0.01
+DEDUP_WARM_DAYS = 30          # açılışta Bloom'a yüklenecek geçmiş
+bloom = BloomFilter(DEDUP_BLOOM_CAPACITY, DEDUP_BLOOM_ERROR_RATE)
+db_prepared = False           # şema kontrolü ve Bloom ısıtması ilk bağlantıda bir kez yapılır
+dedup_stats = {'inserted': 0, 'duplicates': 0}
+
+def load_checkpoints():
     try:
-        return datetime.strptime(date_str.strip(), "%d %b %Y").date()
-    except:
-        return datetime.now().date()
+        with open(CHECKPOINT_PATH, "r", encoding="utf-8") as f:
+            return {int(chat_id): msg_id for chat_id, msg_id in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+def save_checkpoints():
+    tmp_path = CHECKPOINT_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({str(chat_id): msg_id for chat_id, msg_id in checkpoints.items()}, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
 
-# Veritabanına kayıt fonksiyonu
-def insert_log_to_db(chat_label, sender_name, message, timestamp):
+# Kalıcı bağlantıyı döndür, kopmuşsa yeniden bağlan (yalnızca db_executor thread'inde çağrılır)
+def get_db_connection():
+    global db_connection
+    global db_prepared
+    if db_connection is None or not db_connection.is_connected():
+        db_connection = mysql.connector.connect(**DB_CONFIG)
+    if not db_prepared:
+        ensure_dedup_schema(db_connection)
+        # Parmak izi tam içerikten hesaplanmalı: önce gövdeler geri taşınır
+        restored = restore_message_bodies(db_connection)
+        if restored:
+            print(f"🔧 {restored} mesaj gövdesi content kolonuna geri taşındı")
+        backfilled = backfill_fingerprints(db_connection)
+        if backfilled:
+            print(f"🔧 {backfilled} eski kaydın parmak izi dolduruldu")
+        ensure_advisory_schema(db_connection)
+        ensure_search_indexes(db_connection)
+        ensure_compressed_tables(db_connection)
+        warmed = warm_bloom(db_connection, bloom, DEDUP_WARM_DAYS)
+        db_prepared = True
+        print(f"✅ Tekrar filtresi {warmed} kayıtla ısıtıldı (son {DEDUP_WARM_DAYS} gün)")
+    return db_connection
+
+def reset_db_connection():
+    global db_connection
+    if db_connection is not None:
+        try:
+            db_connection.close()
+        except Exception:
+            pass
+    db_connection = None
+
+def is_connectivity_error(e):
+    if isinstance(e, mysql_errors.InterfaceError):
+        return True
+    return isinstance(e, mysql_errors.OperationalError) and e.errno in CONNECTION_ERRNOS
+
+# Kayıtları tablo bazında executemany ile tek transaction'da yaz, tekrarları say
+def insert_batch_to_db(records, chunk_size=WRITE_BATCH_SIZE):
+    inserted, duplicates = write_records(get_db_connection(), records, bloom, chunk_size)
+    dedup_stats['inserted'] += inserted
+    dedup_stats['duplicates'] += duplicates
+    if duplicates:
+        print(f"♻️ {duplicates} tekrar mesaj atlandı (toplam {dedup_stats['duplicates']})")
+
+# Batch'i yaz; veri hatasında kayıtları tek tek deneyip yazılamayanları karantinaya al.
+# Bağlantı hataları çağırana iletilir (spool'a düşme / tekrar deneme kararı orada verilir)
+def insert_or_quarantine(records, chunk_size=WRITE_BATCH_SIZE):
+    global quarantined_records
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
+        insert_batch_to_db(records, chunk_size)
+        return
+    except Exception as e:
+        if is_connectivity_error(e):
+            raise
+        print(f"[!] Batch veri hatasıyla reddedildi, {len(records)} kayıt tek tek deneniyor: {e}")
+
+    for record in records:
+        try:
+            insert_batch_to_db([record], chunk_size)
+        except Exception as e:
+            if is_connectivity_error(e):
+                raise
+            quarantine.append([record], error=str(e))
+            quarantined_records += 1
+            print(f"[!] Kayıt karantinaya alındı ({record[0]}): {e}")
+
+# DB'ye yaz, DB erişilemiyorsa kaydı kaybetmemek için spool'a düş; DB'ye yazıldıysa True
+def write_or_spool(records):
+    global db_healthy
+    if db_healthy:
+        try:
+            insert_or_quarantine(records)
+            return True
+        except Exception as e:
+            print(f"[!] Veritabanı hatası, {len(records)} kayıt spool'a yazılıyor: {e}")
+            if is_connectivity_error(e):
+                db_healthy = False
+            reset_db_connection()
+    spool.append(records)
+    return False
+
+# Spool'daki en eski segmenti DB'ye aktar; ilerleme olduysa True döner
+def replay_spool_step():
+    global db_healthy
+    segments = spool.pending_segments()
+    if not segments:
+        # Writer'ın hâlâ yazdığı segmenti kapatıp replay'e aç
+        spool.seal()
+        segments = spool.pending_segments()
+
+    if not segments:
+        if not db_healthy:
+            get_db_connection()
+            db_healthy = True
+            print("✅ Veritabanı bağlantısı geri geldi")
+        return False
 
-        # JSON varsa ayıkla
-        json_match = re.search(r'\{[\s\S]*?\}', message)
-        if json_match:
+    path = segments[0]
+    records = spool.read_segment(path)
+    # Veri hatalı kayıtlar karantinaya alınır; segment bir daha denenmek üzere bekletilmez
+    insert_or_quarantine(records, chunk_size=SPOOL_REPLAY_BATCH_SIZE)
+    spool.remove(path)
+    db_healthy = True
+    print(f"✅ Spool segmenti aktarıldı: {os.path.basename(path)} ({len(records)} kayıt), "
+          f"kalan {len(segments) - 1} segment")
+    return True
+
+# Kuyruktaki kayıtları toplayıp veritabanına yazan görev
+async def db_writer():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await write_queue.get()]
+        deadline = loop.time() + WRITE_FLUSH_INTERVAL
+
+        # Yoğun anlarda kuyruğu hemen boşalt, sakin anlarda kısa süre biriktir
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(write_queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
             try:
-                data = json.loads(json_match.group(0))
-            except Exception as e:
-                print(f"[!] JSON ayrıştırma hatası: {e}")
-                data = {}
-
-            if "ADP" in chat_label:
-                cursor.execute("""
-                    INSERT INTO vulnerabilities (channel, source, title, content, detection_date, type)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    chat_label,
-                    data.get("Source", "UNKNOWN"),
-                    data.get("Title", message[:100]),
-                    data.get("Content", message),
-                    parse_date(data.get("Detection Date")),
-                    data.get("Type", "Vulnerability")
-                ))
-            else:
-                cursor.execute("""
-                    INSERT INTO leak_logs (channel, source, content, author, detection_date, type)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    chat_label,
-                    data.get("Source", "UNKNOWN"),
-                    data.get("Content", message),
-                    data.get("author", sender_name),
-                    parse_date(data.get("Detection Date")),
-                    data.get("Type", "Data leak")
-                ))
+                batch.append(await asyncio.wait_for(write_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        records = [(table, values, str(msg_id)) for table, values, _, msg_id, _, _ in batch]
+        flush_started = loop.time()
+        try:
+            committed = await loop.run_in_executor(db_executor, write_or_spool, records)
+        except Exception as e:
+            print(f"[!] Kayıtlar ne DB'ye ne spool'a yazılabildi ({len(batch)} kayıt): {e}")
+            frozen_checkpoints.update(chat_id for _, _, chat_id, _, _, _ in batch)
         else:
-            # JSON yoksa düz content olarak gir
-            cursor.execute("""
-                INSERT INTO leak_logs (channel, source, content, author, detection_date, type)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
-                chat_label,
-                "UNKNOWN",
-                message,
-                sender_name,
-                timestamp.date(),
-                "Data leak"
-            ))
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        print(f"[!] Veritabanı hatası: {e}")
+            metrics.record_flush(len(batch), loop.time() - flush_started, committed,
+                                 [(values[0], message_time) for _, values, _, _, message_time, _ in batch])
+
+            # Checkpoint yalnızca kayıt kalıcı hale geldikten sonra ilerler
+            advanced = False
+            for _, _, chat_id, msg_id, _, advances in batch:
+                if not advances or chat_id in frozen_checkpoints:
+                    continue
+                if msg_id > checkpoints.get(chat_id, 0):
+                    checkpoints[chat_id] = msg_id
+                    advanced = True
+            if advanced:
+                try:
+                    save_checkpoints()
+                except OSError as e:
+                    print(f"[!] Checkpoint yazılamadı: {e}")
+        finally:
+            for _ in batch:
+                write_queue.task_done()
+
+# Spool'u DB'ye geri aktaran ve durumunu yayınlayan görev
+async def spool_replayer():
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            progressed = await loop.run_in_executor(db_executor, replay_spool_step)
+        except Exception as e:
+            print(f"[!] Spool aktarımı başarısız, tekrar denenecek: {e}")
+            await loop.run_in_executor(db_executor, reset_db_connection)
+            progressed = False
+
+        try:
+            spool_status.update(await loop.run_in_executor(db_executor, spool.stats))
+            await loop.run_in_executor(db_executor, spool.write_status, SPOOL_STATUS_PATH, dict(spool_status))
+        except OSError as e:
+            print(f"[!] Spool durum dosyası yazılamadı: {e}")
+
+        # İlerleme varken ara vermeden devam et
+        if not progressed:
+            await asyncio.sleep(SPOOL_REPLAY_INTERVAL)
+
+# Mesajı transcript'e yaz ve DB kuyruğuna ekle (canlı ve geri doldurma ortak yolu)
+async def ingest_message(chat_id, msg, now, live=True):
+    chat_label = TARGET_CHANNELS.get(chat_id, f"Chat_{chat_id}")
+    message = msg.message or "<Boş mesaj>"
+    timestamp_str = now.strftime('%Y-%m-%d %H:%M:%S')
+
+    try:
+        sender = await msg.get_sender()
+        sender_name = getattr(sender, 'first_name', 'Bilinmiyor')
+    except:
+        sender_name = "Bilinmiyor"
+
+    # Mesaj id'si replay'in kısa mesajları canlı yazımla aynı parmak iziyle eşlemesi için yazılır
+    log_line = f"[{timestamp_str}] ({chat_label}) #{msg.id} {sender_name}: {message}"
+    print(log_line)
+
+    transcripts.write(chat_label, now, log_line)
+
+    # DB yazımı db_writer görevinde toplu yapılır
+    metrics.record_message(chat_label)
+    table, values = parse_message(chat_label, sender_name, message, now, stats=metrics.channel(chat_label))
+    # Karar kuyruğa girerken verilir: geri doldurma bittikten sonra gelen canlı mesajlar
+    # FIFO kuyrukta kalan tüm geri doldurma kayıtlarının arkasındadır
+    advances = not live or chat_id in caught_up
+    await write_queue.put((table, values, chat_id, msg.id, msg.date.timestamp(), advances))
 
 # Mesaj yakalama
 @client.on(events.NewMessage(chats=list(TARGET_CHANNELS.keys())))
 async def handler(event):
-    async with file_lock:
-        chat_id = event.chat_id
-        chat_label = TARGET_CHANNELS.get(chat_id, f"Chat_{chat_id}")
-        message = event.message.message or "<Boş mesaj>"
-        now = datetime.now()
-        timestamp_str = now.strftime('%Y-%m-%d %H:%M:%S')
+    await ingest_message(event.chat_id, event.message, datetime.now())
 
-        try:
-            sender = await event.get_sender()
-            sender_name = getattr(sender, 'first_name', 'Bilinmiyor')
-        except:
-            sender_name = "Bilinmiyor"
+def metrics_snapshot():
+    return metrics.snapshot(
+        queue_depth=write_queue.qsize(),
+        queue_maxsize=WRITE_QUEUE_MAXSIZE,
+        db_healthy=db_healthy,
+        dedup=dict(dedup_stats),
+        quarantined_records=quarantined_records,
+        spool=dict(spool_status),
+        checkpoints={TARGET_CHANNELS.get(chat_id, str(chat_id)): msg_id for chat_id, msg_id in checkpoints.items()}
+    )
+
+# Kapalı kalınan süredeki mesajları checkpoint'ten itibaren sırayla çek
+async def catch_up():
+    for chat_id, chat_label in TARGET_CHANNELS.items():
+        last_id = checkpoints.get(chat_id)
+        if last_id is None:
+            # İlk çalıştırma: geçmiş çekilmez, canlı mesajlarla başlanır
+            caught_up.add(chat_id)
+            continue
 
-        log_line = f"[{timestamp_str}] ({chat_label}) {sender_name}: {message}"
-        print(log_line)
+        count = 0
+        try:
+            # iter_messages sayfa sayfa (100'er) çeker; kuyruk dolunca put beklediği için bellek sınırlı kalır
+            async for msg in client.iter_messages(chat_id, min_id=last_id, reverse=True):
+                msg_time = msg.date.astimezone().replace(tzinfo=None)
+                await ingest_message(chat_id, msg, msg_time, live=False)
+                count += 1
+        except Exception as e:
+            # Checkpoint son geri doldurulan mesajda kalır; eksik aralık sonraki açılışta çekilir
+            print(f"[!] {chat_label} geri doldurma hatası ({count} mesaj sonrası), "
+                  f"checkpoint bu çalışmada ilerletilmeyecek: {e}")
+            continue
 
-        filename = f"telethon_{chat_label}.txt"
-        with open(filename, "a", encoding="utf-8") as f:
-            f.write(log_line + "\n")
+        caught_up.add(chat_id)
+        if count:
+            print(f"✅ {chat_label}: kapalı kalınan sürede gelen {count} mesaj alındı")
 
-        insert_log_to_db(chat_label, sender_name, message, now)
+async def main():
+    checkpoints.update(load_checkpoints())
+    await client.start()
+    writer_task = asyncio.create_task(db_writer())
+    replayer_task = asyncio.create_task(spool_replayer())
+    flusher_task = asyncio.create_task(transcripts.run_flusher())
+    try:
+        metrics_server = await serve_metrics(METRICS_HOST, METRICS_PORT, metrics_snapshot)
+        print(f"📈 Metrikler: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    except OSError as e:
+        metrics_server = None
+        print(f"[!] Metrik endpoint'i başlatılamadı: {e}")
+    # Canlı handler zaten dinliyor; aradaki çakışmalar parmak izi ile ayıklanır
+    await catch_up()
+    # Geri doldurma eski günlerin segmentlerine yazabilir; sıkıştırma ondan sonra başlar
+    transcripts.compress_stale_segments(datetime.now().strftime("%Y-%m-%d"))
+    print("✅ Etem logger aktif! Mesajlar kaydediliyor... 🧠")
+    try:
+        await client.run_until_disconnected()
+    finally:
+        # Kuyrukta kalanları yazmadan çıkma (DB kapalıysa spool'a düşer)
+        await write_queue.join()
+        writer_task.cancel()
+        replayer_task.cancel()
+        flusher_task.cancel()
+        if metrics_server:
+            metrics_server.close()
+        await transcripts.close()
+        await asyncio.get_running_loop().run_in_executor(db_executor, spool.seal)
+        await asyncio.get_running_loop().run_in_executor(db_executor, quarantine.seal)
 
 # Başlat
-print("✅ Etem logger aktif! Mesajlar kaydediliyor... 🧠")
-client.start()
-client.run_until_disconnected()
+client.loop.run_until_complete(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Mevcut vulnerabilities satırlarını CVE/ürün yan tablolarına işleyen tek seferlik iş."""
+
+import time
+import argparse
+import mysql.connector
+from mysql.connector import Error
+from datetime import datetime
+
+from advisory import ensure_advisory_schema, index_advisories
+from bodies import restore_message_bodies
+
+# Veritabanı bilgileri
+DB_CONFIG = {
+    'host': '192.168.70.70',
+    'database': 'lapsusacc',
+    'user': 'root',
+    'password': 'daaqwWdas21as',
+    'charset': 'utf8mb4',
+    'port': 3306
+}
+
+# Tek transaction'da işlenecek satır sayısı
+BATCH_SIZE = 5000
+
+
+class AdvisoryBackfill:
+    """vulnerabilities tablosunu id sırasıyla (keyset) tarayıp tanımlayıcıları çıkarır.
+
+    Yan tablolara INSERT IGNORE ile yazıldığından yarıda kesilip tekrar
+    çalıştırılabilir; --start-id ile kalınan yerden devam edilir.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.connection = None
+
+    def log(self, message):
+        """Log mesajı yazdır"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] {message}")
+
+    def connect_db(self):
+        """Veritabanına bağlan"""
+        try:
+            self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection.is_connected()
+        except Error as e:
+            self.log(f"❌ Database bağlantı hatası: {e}")
+            return False
+
+    def disconnect_db(self):
+        """Veritabanı bağlantısını kapat"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+
+    def process_batch(self, last_id):
+        """last_id'den sonraki batch'i işle; (yeni last_id, satır, ref) döndür"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT id, title, content FROM vulnerabilities
+                WHERE id > %s ORDER BY id LIMIT %s
+            """, (last_id, self.batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return last_id, 0, 0
+
+            refs = index_advisories(cursor, rows)
+            self.connection.commit()
+            return rows[-1][0], len(rows), refs
+        except Error:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def run(self, start_id=0):
+        """Ana çalıştırma fonksiyonu"""
+        if not self.connect_db():
+            return False
+
+        start = time.time()
+        total_rows = 0
+        total_refs = 0
+        last_id = start_id
+        try:
+            ensure_advisory_schema(self.connection)
+            # Eski sürümlerin ayırdığı gövdeler önce content'e döner, CVE'ler tam metinden çıkar
+            restore_message_bodies(self.connection)
+            while True:
+                last_id, rows, refs = self.process_batch(last_id)
+                if not rows:
+                    break
+                total_rows += rows
+                total_refs += refs
+                self.log(f"📦 id {last_id}'e kadar {total_rows} satır işlendi, {total_refs} ref")
+
+        except Error as e:
+            self.log(f"❌ Backfill hatası (son id {last_id}): {e}")
+            return False
+        finally:
+            self.disconnect_db()
+
+        self.log(f"✅ {total_rows} satır, {total_refs} ref {time.time() - start:.2f}s içinde işlendi")
+        return True
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="vulnerabilities satırlarını CVE/ürün index'ine işle")
+    parser.add_argument('--start-id', type=int, default=0, help="Bu id'den sonrasını işle")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Batch başına satır")
+    args = parser.parse_args()
+
+    try:
+        AdvisoryBackfill(batch_size=args.batch_size).run(start_id=args.start_id)
+    except KeyboardInterrupt:
+        print("\n\n⚠️ İşlem kullanıcı tarafından durduruldu!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""message_parser için mikro benchmark: eski regex yolu ile tek geçişli tarayıcıyı karşılaştırır."""
+
+import re
+import json
+import timeit
+import argparse
+
+from message_parser import extract_json_object
+
+OLD_PATTERN = r'\{[\s\S]*?\}'
+
+ADVISORY = {
+    "Source": "NVD",
+    "Title": "CVE-2024-12345 - Remote code execution in Example CMS",
+    "Content": "A crafted request to /admin/upload allows arbitrary file upload.",
+    "Detection Date": "12 Mar 2024",
+    "Type": "Vulnerability"
+}
+
+# Kanallarda görülen mesaj biçimleri
+CORPUS = {
+    "flat_json": json.dumps(ADVISORY),
+    "prefixed_json": "🚨 Yeni zafiyet bildirimi\n\n" + json.dumps(ADVISORY, indent=2),
+    "nested_json": json.dumps(dict(ADVISORY, CVSS={"score": 9.8, "vector": {"AV": "N", "AC": "L"}},
+                                   Products=[{"vendor": "example", "name": "cms"}])),
+    "braces_in_string": json.dumps(dict(ADVISORY, Content="payload: ${jndi:ldap://x/a} and {{7*7}}")),
+    "escaped_quotes": json.dumps(dict(ADVISORY, Content='he said "use {curly}" \\ twice')),
+    "plain_text": "Sızıntı: example.com.tr kullanıcı listesi paylaşıldı, toplam 1200 kayıt. " * 3,
+    "long_text_json_at_end": ("lorem ipsum dolor sit amet " * 200) + json.dumps(ADVISORY),
+    "invalid_braces": "fiyat {belirsiz} ve {eksik: kapanış",
+}
+
+
+def old_extract(message):
+    match = re.search(OLD_PATTERN, message)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(0))
+    except ValueError:
+        return {}
+
+
+def new_extract(message):
+    try:
+        return extract_json_object(message)
+    except ValueError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON payload çıkarma benchmark'ı")
+    parser.add_argument('--number', type=int, default=20000, help="Her ölçümdeki çağrı sayısı")
+    parser.add_argument('--repeat', type=int, default=5, help="Ölçüm tekrarı (en iyisi raporlanır)")
+    args = parser.parse_args()
+
+    print(f"{'mesaj biçimi':<24}{'uzunluk':>8}{'regex µs':>11}{'tarayıcı µs':>13}  sonuç (regex/tarayıcı)")
+    for name, message in CORPUS.items():
+        old_best = min(timeit.repeat(lambda: old_extract(message), number=args.number, repeat=args.repeat))
+        new_best = min(timeit.repeat(lambda: new_extract(message), number=args.number, repeat=args.repeat))
+
+        def describe(result):
+            if result is None:
+                return "yok"
+            return "boş" if not result else f"{len(result)} alan"
+
+        print(f"{name:<24}{len(message):>8}"
+              f"{old_best / args.number * 1e6:>11.2f}{new_best / args.number * 1e6:>13.2f}"
+              f"  {describe(old_extract(message))}/{describe(new_extract(message))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import zlib
+
+# İçerik ana tablolarda tam olarak tutulur; yer tasarrufu InnoDB sayfa sıkıştırmasıyla
+# sağlanır (FULLTEXT index'ler ROW_FORMAT=COMPRESSED tablolarda da çalışır)
+COMPRESSED_TABLES = ['vulnerabilities', 'leak_logs']
+
+# Eski sürümlerin uzun gövdeleri ayırdığı message_bodies tablosunun kind değerleri
+BODY_KINDS = {
+    'vulnerabilities': 1,
+    'leak_logs': 2
+}
+
+# message_bodies'den content kolonuna geri taşıma batch'i
+BODY_RESTORE_BATCH = 1000
+
+
+def ensure_compressed_tables(conn):
+    """Ingest tablolarını ROW_FORMAT=COMPRESSED'a çevir (tablo yeniden kurulur, tek seferlik)"""
+    cursor = conn.cursor()
+    try:
+        for table in COMPRESSED_TABLES:
+            cursor.execute("""
+                SELECT ROW_FORMAT FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, (table,))
+            row = cursor.fetchone()
+            if row and row[0] != 'Compressed':
+                print(f"🔧 {table} tablosu ROW_FORMAT=COMPRESSED'a çevriliyor...")
+                cursor.execute(f"ALTER TABLE `{table}` ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8")
+    finally:
+        cursor.close()
+
+
+def decompress_body(blob):
+    return zlib.decompress(blob).decode('utf-8')
+
+
+def restore_message_bodies(conn, batch_size=BODY_RESTORE_BATCH):
+    """message_bodies'deki gövdeleri ait oldukları satırın content kolonuna geri yaz.
+
+    Yarıda kesilirse kalan satırlardan devam eder; tablo boşalınca kaldırılır.
+    Taşınan satır sayısını döndürür.
+    """
+    restored = 0
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'message_bodies'
+        """)
+        if not cursor.fetchone()[0]:
+            return 0
+
+        for table, kind in BODY_KINDS.items():
+            while True:
+                cursor.execute(
+                    "SELECT row_id, body FROM message_bodies WHERE kind = %s ORDER BY row_id LIMIT %s",
+                    (kind, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                conn.start_transaction()
+                try:
+                    cursor.executemany(
+                        f"UPDATE `{table}` SET content = %s WHERE id = %s",
+                        [(decompress_body(body), row_id) for row_id, body in rows]
+                    )
+                    cursor.executemany(
+                        "DELETE FROM message_bodies WHERE kind = %s AND row_id = %s",
+                        [(kind, row_id) for row_id, _ in rows]
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                restored += len(rows)
+
+        cursor.execute("DROP TABLE message_bodies")
+    finally:
+        cursor.close()
+    return restored
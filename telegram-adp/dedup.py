@@ -0,0 +1,61 @@
+import re
+import math
+import hashlib
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Parmak izine giren kolonların değer tuple'ındaki sırası
+FINGERPRINT_FIELDS = {
+    'vulnerabilities': (2, 3),  # title, content
+    'leak_logs': (2,)           # content
+}
+
+
+def normalize_text(text):
+    """Büyük/küçük harf ve boşluk farklarını yok say"""
+    return _WHITESPACE.sub(' ', str(text or '')).strip().lower()
+
+
+# Bu uzunluğun altındaki içerik ("<Boş mesaj>", "ok", tek emoji...) tekrar sayılmaz
+TRIVIAL_CONTENT_LENGTH = 20
+
+
+def content_fingerprint(table, values, message_key=None):
+    """Aynı içeriğin farklı kanal/yazar ile tekrar paylaşımlarında aynı kalan sha1 hex.
+
+    Kısa/boş içerik farklı mesajlarda doğal olarak tekrarlanır; bunlarda parmak
+    izine kanal ve mesaj anahtarı da girer, böylece yalnızca aynı mesajın tekrar
+    yazımı birleşir. Anahtarı bilinmeyen kayıtlar içerikten hesaplanır.
+    """
+    parts = [table] + [normalize_text(values[i]) for i in FINGERPRINT_FIELDS[table]]
+    if message_key is not None and len(''.join(parts[1:])) < TRIVIAL_CONTENT_LENGTH:
+        parts += [normalize_text(values[0]), str(message_key)]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class BloomFilter:
+    """sha1 hex parmak izleri için bit dizisi tabanlı Bloom filtresi.
+
+    Parmak izi zaten eşit dağılımlı olduğundan ek hash yerine iki yarısından
+    double hashing ile k indeks türetilir. Negatif cevap kesindir, pozitif cevap
+    yalnızca 'muhtemelen görüldü' anlamına gelir.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint):
+        h1 = int(fingerprint[:16], 16)
+        h2 = int(fingerprint[16:32], 16) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, fingerprint):
+        for pos in self._positions(fingerprint):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, fingerprint):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fingerprint))
@@ -0,0 +1,84 @@
+import json
+from datetime import datetime
+
+# Derlenmiş (C) JSON tarayıcısı; raw_decode tek geçişte iç içe nesne ve string'leri çözer
+_DECODER = json.JSONDecoder()
+
+
+# Tarihi parse et (parse edilemezse default, o da yoksa bugün)
+def parse_date(date_str, default=None):
+    try:
+        return datetime.strptime(date_str.strip(), "%d %b %Y").date()
+    except:
+        return default or datetime.now().date()
+
+
+def extract_json_object(text):
+    """Metindeki ilk geçerli en dış JSON nesnesini dict olarak döndür.
+
+    Her '{' adayında derlenmiş JSON tarayıcısı çalışır; iç içe nesneler ve string
+    içindeki süslü parantezler doğru işlenir. Aday geçersizse arama hatanın
+    oluştuğu konumdan devam eder, böylece her karakter en fazla bir kez taranır.
+    Hiç '{' yoksa None döner; aday(lar) olup hiçbiri geçerli değilse son hatayı
+    ValueError olarak yükseltir.
+    """
+    error = None
+    pos = text.find('{')
+    while pos != -1:
+        try:
+            data, _ = _DECODER.raw_decode(text, pos)
+            return data
+        except ValueError as e:
+            error = e
+            pos = text.find('{', max(getattr(e, 'pos', pos), pos + 1))
+
+    if error is not None:
+        raise error
+    return None
+
+
+# Mesajı hedef tablo ve kolon değerlerine ayrıştır
+# stats verilirse 'json' / 'plain' / 'parse_failures' sayaçları güncellenir ve hata basılmaz
+def parse_message(chat_label, sender_name, message, timestamp, stats=None):
+    # JSON varsa ayıkla
+    try:
+        data = extract_json_object(message)
+    except ValueError as e:
+        if stats is None:
+            print(f"[!] JSON ayrıştırma hatası: {e}")
+        else:
+            stats['parse_failures'] = stats.get('parse_failures', 0) + 1
+        data = {}
+
+    if stats is not None:
+        kind = 'json' if data else 'plain'
+        stats[kind] = stats.get(kind, 0) + 1
+
+    if data is not None:
+        if "ADP" in chat_label:
+            return 'vulnerabilities', (
+                chat_label,
+                data.get("Source", "UNKNOWN"),
+                data.get("Title", message[:100]),
+                data.get("Content", message),
+                parse_date(data.get("Detection Date"), timestamp.date()),
+                data.get("Type", "Vulnerability")
+            )
+        return 'leak_logs', (
+            chat_label,
+            data.get("Source", "UNKNOWN"),
+            data.get("Content", message),
+            data.get("author", sender_name),
+            parse_date(data.get("Detection Date"), timestamp.date()),
+            data.get("Type", "Data leak")
+        )
+
+    # JSON yoksa düz content olarak gir
+    return 'leak_logs', (
+        chat_label,
+        "UNKNOWN",
+        message,
+        sender_name,
+        timestamp.date(),
+        "Data leak"
+    )
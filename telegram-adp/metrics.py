@@ -0,0 +1,127 @@
+import json
+import time
+import asyncio
+from collections import deque
+
+# messages/sec hesaplanan kayan pencere (saniye)
+RATE_WINDOW = 60
+
+
+class IngestMetrics:
+    """Logger'ın kanal bazlı ingest sayaçları; yalnızca event loop thread'inden güncellenir"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.channels = {}
+        self.batches = 0
+        self.last_batch_size = 0
+        self.total_batch_records = 0
+        self.last_flush_ms = None
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.spooled_batches = 0
+
+    def channel(self, chat_label):
+        """Kanalın sayaç sözlüğü; parse_message'a stats olarak da verilir"""
+        if chat_label not in self.channels:
+            self.channels[chat_label] = {
+                'messages': 0, 'json': 0, 'plain': 0, 'parse_failures': 0,
+                'recent': deque(),
+                'last_lag_seconds': None, 'max_lag_seconds': 0.0
+            }
+        return self.channels[chat_label]
+
+    def record_message(self, chat_label):
+        stats = self.channel(chat_label)
+        stats['messages'] += 1
+        now = time.time()
+        recent = stats['recent']
+        recent.append(now)
+        # Endpoint okunmasa da pencere dışı kayıtlar birikmesin
+        while recent[0] < now - RATE_WINDOW:
+            recent.popleft()
+
+    def record_flush(self, batch_size, flush_seconds, committed, message_times):
+        """Bir DB batch'i sonrası: boyut, süre ve commit edilen kayıtların uçtan uca gecikmesi"""
+        flush_ms = flush_seconds * 1000
+        self.batches += 1
+        self.last_batch_size = batch_size
+        self.total_batch_records += batch_size
+        self.last_flush_ms = flush_ms
+        self.max_flush_ms = max(self.max_flush_ms, flush_ms)
+        self.total_flush_ms += flush_ms
+        if not committed:
+            self.spooled_batches += 1
+            return
+
+        now = time.time()
+        for chat_label, message_time in message_times:
+            stats = self.channel(chat_label)
+            lag = max(0.0, now - message_time)
+            stats['last_lag_seconds'] = round(lag, 3)
+            stats['max_lag_seconds'] = round(max(stats['max_lag_seconds'], lag), 3)
+
+    def snapshot(self, **extra):
+        now = time.time()
+        channels = {}
+        for chat_label, stats in self.channels.items():
+            recent = stats['recent']
+            while recent and recent[0] < now - RATE_WINDOW:
+                recent.popleft()
+            parsed = stats['json'] + stats['plain']
+            channels[chat_label] = {
+                'messages': stats['messages'],
+                'messages_per_second': round(len(recent) / RATE_WINDOW, 3),
+                'json': stats['json'],
+                'plain': stats['plain'],
+                'json_ratio': round(stats['json'] / parsed, 3) if parsed else None,
+                'parse_failures': stats['parse_failures'],
+                'last_lag_seconds': stats['last_lag_seconds'],
+                'max_lag_seconds': stats['max_lag_seconds']
+            }
+
+        return {
+            'uptime_seconds': round(now - self.started_at, 1),
+            'channels': channels,
+            'db': {
+                'batches': self.batches,
+                'spooled_batches': self.spooled_batches,
+                'last_batch_size': self.last_batch_size,
+                'avg_batch_size': round(self.total_batch_records / self.batches, 1) if self.batches else None,
+                'last_flush_ms': round(self.last_flush_ms, 1) if self.last_flush_ms is not None else None,
+                'avg_flush_ms': round(self.total_flush_ms / self.batches, 1) if self.batches else None,
+                'max_flush_ms': round(self.max_flush_ms, 1)
+            },
+            **extra
+        }
+
+
+async def serve_metrics(host, port, get_snapshot):
+    """GET /metrics için JSON dönen minimal HTTP sunucusu (aynı event loop'ta çalışır)"""
+
+    async def handle(reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Başlıkları boşalt
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+                pass
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] in ('/', '/metrics'):
+                status = '200 OK'
+                body = json.dumps(get_snapshot(), ensure_ascii=False, default=str).encode('utf-8')
+            else:
+                status = '404 Not Found'
+                body = b'{"error": "not found"}'
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""telethon_<kanal>*.txt(.gz) transcript'lerinden vulnerabilities/leak_logs tablolarını yeniden kurar.
+
+Canlı logger ile aynı ayrıştırıcı (message_parser) ve aynı yazma yolu (store:
+parmak izi tekrar ayıklama, sıkıştırılmış gövde, CVE index) kullanılır.
+Dosyalar akış halinde okunur, sınırlı boyutlu mesaj parçaları ayrı süreçlerde
+paralel ayrıştırılır, yazma tek bağlantıdan toplu yapılır.
+"""
+
+import os
+import re
+import glob
+import gzip
+import time
+import argparse
+from collections import deque
+import mysql.connector
+from mysql.connector import Error
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from message_parser import parse_message
+from dedup import BloomFilter
+from store import ensure_dedup_schema, ensure_search_indexes, backfill_fingerprints, warm_bloom, write_records
+from advisory import ensure_advisory_schema
+from bodies import ensure_compressed_tables, restore_message_bodies
+
+# Veritabanı bilgileri
+DB_CONFIG = {
+    'host': '192.168.70.70',
+    'database': 'lapsusacc',
+    'user': 'root',
+    'password': 'daaqwWdas21as',
+    'charset': 'utf8mb4',
+    'port': 3306
+}
+
+# Tek transaction'da yazılacak kayıt sayısı
+BATCH_SIZE = 5000
+
+# --truncate ile boşaltılan tablolar
+REBUILD_TABLES = ['vulnerabilities', 'leak_logs', 'vulnerability_cves', 'vulnerability_products']
+
+# "[2025-01-31 12:00:00] (Kanal_ADP) #123 Gönderen: mesaj" - mesajın devamı sonraki satırlarda olabilir,
+# eski transcript'lerde mesaj id'si (#123) yoktur
+LINE_HEADER = re.compile(r'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] \(([^)]*)\) (?:#(\d+) )?(.*?): ', re.DOTALL)
+
+
+def iter_transcript_messages(path):
+    """Transcript'i satır satır okuyup (zaman, kanal, mesaj anahtarı, gönderen, mesaj) üret"""
+    opener = gzip.open if path.endswith('.gz') else open
+    current = None
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = LINE_HEADER.match(line)
+            if match:
+                if current:
+                    yield current[:4] + (''.join(current[4]).rstrip('\n'),)
+                timestamp = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S')
+                # Id'siz eski satırlarda zaman ve gönderen mesajı ayırt eder
+                message_key = match.group(3) or f"{match.group(1)}|{match.group(4)}"
+                current = (timestamp, match.group(2), message_key, match.group(4), [line[match.end():]])
+            elif current:
+                # Çok satırlı mesajın devamı
+                current[4].append(line)
+    if current:
+        yield current[:4] + (''.join(current[4]).rstrip('\n'),)
+
+
+def iter_message_chunks(paths, chunk_size):
+    """Dosyaların mesajlarını en fazla chunk_size'lık parçalar halinde (yol, mesajlar, dosya sonu mu) üret"""
+    for path in paths:
+        chunk = []
+        for message in iter_transcript_messages(path):
+            chunk.append(message)
+            if len(chunk) >= chunk_size:
+                yield path, chunk, False
+                chunk = []
+        yield path, chunk, True
+
+
+def parse_chunk(messages):
+    """Mesaj parçasını ayrıştır (işçi süreçte çalışır)"""
+    stats = {'messages': 0}
+    records = []
+    for timestamp, chat_label, message_key, sender_name, message in messages:
+        table, values = parse_message(chat_label, sender_name, message, timestamp, stats=stats)
+        records.append((table, values, message_key))
+        stats['messages'] += 1
+    return records, stats
+
+
+class TranscriptReplay:
+    """Transcript dosyalarını paralel ayrıştırıp toplu olarak veritabanına yükler"""
+
+    def __init__(self, batch_size=BATCH_SIZE, workers=None, warm_days=30):
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count()
+        self.warm_days = warm_days
+        self.connection = None
+        self.bloom = BloomFilter()
+        self.totals = {'files': 0, 'messages': 0, 'json': 0, 'plain': 0, 'parse_failures': 0,
+                       'inserted': 0, 'duplicates': 0}
+        self.file_messages = 0
+
+    def log(self, message):
+        """Log mesajı yazdır"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] {message}")
+
+    def connect_db(self):
+        """Veritabanına bağlan"""
+        try:
+            self.connection = mysql.connector.connect(**DB_CONFIG)
+            return self.connection.is_connected()
+        except Error as e:
+            self.log(f"❌ Database bağlantı hatası: {e}")
+            return False
+
+    def disconnect_db(self):
+        """Veritabanı bağlantısını kapat"""
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+
+    def prepare(self, truncate):
+        """Şemayı hazırla, istenirse tabloları boşalt, tekrar filtresini ısıt"""
+        ensure_dedup_schema(self.connection)
+        ensure_advisory_schema(self.connection)
+        ensure_search_indexes(self.connection)
+
+        if truncate:
+            cursor = self.connection.cursor()
+            for table in REBUILD_TABLES:
+                cursor.execute(f"TRUNCATE TABLE `{table}`")
+            # Eski sürümlerin ayrı gövde tablosu boşaltılan satırlarla birlikte gider
+            cursor.execute("DROP TABLE IF EXISTS message_bodies")
+            cursor.close()
+            self.log(f"🗑️ Tablolar boşaltıldı: {', '.join(REBUILD_TABLES)}")
+        else:
+            # Parmak izi tam içerikten hesaplanmalı: önce gövdeler geri taşınır
+            restored = restore_message_bodies(self.connection)
+            if restored:
+                self.log(f"🔧 {restored} mesaj gövdesi content kolonuna geri taşındı")
+            backfilled = backfill_fingerprints(self.connection, self.batch_size)
+            if backfilled:
+                self.log(f"🔧 {backfilled} eski kaydın parmak izi dolduruldu")
+            warmed = warm_bloom(self.connection, self.bloom, self.warm_days)
+            self.log(f"✅ Tekrar filtresi {warmed} kayıtla ısıtıldı")
+        ensure_compressed_tables(self.connection)
+
+    def write(self, records):
+        for i in range(0, len(records), self.batch_size):
+            inserted, duplicates = write_records(self.connection, records[i:i + self.batch_size],
+                                                 self.bloom, self.batch_size)
+            self.totals['inserted'] += inserted
+            self.totals['duplicates'] += duplicates
+
+    def collect(self, path, last, future, start):
+        """Ayrıştırılmış parçayı yaz ve sayaçlara ekle"""
+        records, stats = future.result()
+        self.write(records)
+        for key in ('messages', 'json', 'plain', 'parse_failures'):
+            self.totals[key] += stats.get(key, 0)
+        self.file_messages += stats['messages']
+        if last:
+            self.totals['files'] += 1
+            self.log(f"📄 {os.path.basename(path)}: {self.file_messages} mesaj")
+            self.file_messages = 0
+            self.report(start)
+
+    def report(self, start):
+        elapsed = max(time.time() - start, 0.001)
+        t = self.totals
+        self.log(
+            f"📊 {t['files']} dosya, {t['messages']} mesaj ({t['json']} JSON / {t['plain']} düz metin, "
+            f"{t['parse_failures']} ayrıştırma hatası) → {t['inserted']} eklendi, {t['duplicates']} tekrar | "
+            f"{elapsed:.1f}s, {t['messages'] / elapsed:.0f} mesaj/s"
+        )
+
+    def run(self, paths, truncate=False):
+        """Ana çalıştırma fonksiyonu"""
+        if not paths:
+            self.log("⚠️ Transcript dosyası bulunamadı")
+            return False
+        if not self.connect_db():
+            return False
+
+        start = time.time()
+        try:
+            self.prepare(truncate)
+            self.log(f"🚀 {len(paths)} dosya {self.workers} süreçle ayrıştırılıyor...")
+
+            # Bellekte en fazla `window` parça bekler; büyük bir dosya da parça parça akar.
+            # Sonuçlar gönderim sırasıyla yazılır
+            window = self.workers * 2
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for path, messages, last in iter_message_chunks(paths, self.batch_size):
+                    pending.append((path, last, executor.submit(parse_chunk, messages)))
+                    if len(pending) >= window:
+                        self.collect(*pending.popleft(), start)
+                while pending:
+                    self.collect(*pending.popleft(), start)
+
+        except Error as e:
+            self.log(f"❌ Yükleme hatası: {e}")
+            return False
+        finally:
+            self.disconnect_db()
+
+        self.report(start)
+        return True
+
+
+def find_transcripts(directory):
+    """Dizindeki transcript dosyalarını (sıkıştırılmış segmentler dahil) bul"""
+    paths = glob.glob(os.path.join(directory, 'telethon_*.txt')) + \
+        glob.glob(os.path.join(directory, 'telethon_*.txt.gz'))
+    return sorted(paths)
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Transcript dosyalarından ingest tablolarını yeniden kur")
+    parser.add_argument('paths', nargs='*', help="Transcript dosyaları (varsayılan: --dir içindeki telethon_*)")
+    parser.add_argument('--dir', default='.', help="Transcript dizini")
+    parser.add_argument('--truncate', action='store_true', help="Yüklemeden önce ingest tablolarını boşalt")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Transaction başına kayıt")
+    parser.add_argument('--workers', type=int, default=None, help="Ayrıştırma süreç sayısı")
+    parser.add_argument('--warm-days', type=int, default=30, help="Tekrar filtresine yüklenecek gün sayısı")
+    args = parser.parse_args()
+
+    paths = args.paths or find_transcripts(args.dir)
+    try:
+        TranscriptReplay(batch_size=args.batch_size, workers=args.workers,
+                         warm_days=args.warm_days).run(paths, truncate=args.truncate)
+    except KeyboardInterrupt:
+        print("\n\n⚠️ İşlem kullanıcı tarafından durduruldu!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import json
+import time
+from datetime import datetime
+
+# Segment dosyası bu boyutu aşınca yenisine geçilir
+SPOOL_SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+
+
+class DiskSpool:
+    """MySQL'e yazılamayan kayıtlar için segmentli, yalnızca eklenen JSONL kuyruğu.
+
+    Her append çağrısı tek bir fsync ile diske indirilir. Okuma her zaman en eski
+    kapalı segmentten yapılır; segment DB'ye yazıldıktan sonra silinir (at-least-once).
+    Thread-safe değildir, tek thread'den (db_executor) kullanılmalıdır.
+    """
+
+    def __init__(self, directory, segment_max_bytes=SPOOL_SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.current_file = None
+        self.current_path = None
+
+    def _segment_paths(self):
+        names = sorted(n for n in os.listdir(self.directory)
+                       if n.startswith("segment_") and n.endswith(".jsonl"))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def _open_new_segment(self):
+        seq = 0
+        paths = self._segment_paths()
+        if paths:
+            seq = int(os.path.basename(paths[-1])[8:-6]) + 1
+        self.current_path = os.path.join(self.directory, f"segment_{seq:010d}.jsonl")
+        self.current_file = open(self.current_path, "a", encoding="utf-8")
+
+    def append(self, records, error=None):
+        """(tablo, değerler, mesaj anahtarı) kayıtlarını yaz ve fsync et; error verilirse satıra not olarak eklenir"""
+        if self.current_file is None:
+            self._open_new_segment()
+
+        spooled_at = time.time()
+        for table, values, message_key in records:
+            item = {"table": table, "values": list(values), "key": message_key, "spooled_at": spooled_at}
+            if error is not None:
+                item["error"] = error
+            self.current_file.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+        self.current_file.flush()
+        os.fsync(self.current_file.fileno())
+
+        if self.current_file.tell() >= self.segment_max_bytes:
+            self.seal()
+
+    def seal(self):
+        """Aktif segmenti kapat; sonraki append yeni segment açar"""
+        if self.current_file is not None:
+            self.current_file.close()
+            self.current_file = None
+            self.current_path = None
+
+    def pending_segments(self):
+        """Replay edilebilecek (kapalı) segmentler, eskiden yeniye"""
+        return [p for p in self._segment_paths() if p != self.current_path]
+
+    def read_segment(self, path):
+        """Segmentteki kayıtları (tablo, değerler, mesaj anahtarı) olarak döndür; yarım kalmış son satırı atla"""
+        records = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    print(f"[!] Spool satırı okunamadı, atlandı: {path}")
+                    continue
+                records.append((item["table"], tuple(item["values"]), item.get("key")))
+        return records
+
+    def remove(self, path):
+        os.remove(path)
+
+    def is_empty(self):
+        return not self._segment_paths()
+
+    def stats(self):
+        """İzleme için spool boyutu ve en eski kaydın yaşı"""
+        paths = self._segment_paths()
+        total_bytes = sum(os.path.getsize(p) for p in paths)
+        oldest_age = None
+        if paths:
+            with open(paths[0], "r", encoding="utf-8") as f:
+                first_line = f.readline()
+            try:
+                oldest_age = round(time.time() - json.loads(first_line)["spooled_at"], 1)
+            except (ValueError, KeyError):
+                oldest_age = round(time.time() - os.path.getmtime(paths[0]), 1)
+        return {
+            "segments": len(paths),
+            "bytes": total_bytes,
+            "oldest_age_seconds": oldest_age,
+            "updated_at": datetime.now().isoformat(timespec="seconds")
+        }
+
+    def write_status(self, path, stats=None):
+        """stats() çıktısını harici izleme için atomik olarak dosyaya yaz"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stats or self.stats(), f)
+        os.replace(tmp_path, path)
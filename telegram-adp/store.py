@@ -0,0 +1,234 @@
+import hashlib
+
+from dedup import content_fingerprint
+from advisory import index_advisories
+
+# Tekrar eden içerik yeni satır açmaz, mevcut satırın sayacını artırır
+INSERT_QUERIES = {
+    'vulnerabilities': """
+        INSERT INTO vulnerabilities (channel, source, title, content, detection_date, type, fingerprint)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE duplicate_count = duplicate_count + 1
+    """,
+    'leak_logs': """
+        INSERT INTO leak_logs (channel, source, content, author, detection_date, type, fingerprint)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE duplicate_count = duplicate_count + 1
+    """
+}
+
+# Parmak izi olmayan (kolon eklenmeden önceki) satırlar; kolon sırası FINGERPRINT_FIELDS
+# indeksleriyle uyumlu
+BACKFILL_QUERIES = {
+    'vulnerabilities': """
+        SELECT id, channel, source, title, content
+        FROM vulnerabilities WHERE fingerprint IS NULL AND id > %s ORDER BY id LIMIT %s
+    """,
+    'leak_logs': """
+        SELECT id, channel, source, content
+        FROM leak_logs WHERE fingerprint IS NULL AND id > %s ORDER BY id LIMIT %s
+    """
+}
+
+FINGERPRINT_BACKFILL_BATCH = 5000
+
+
+def ensure_dedup_schema(conn):
+    """fingerprint / duplicate_count kolonlarını ve unique index'i yoksa ekle"""
+    cursor = conn.cursor()
+    try:
+        for table in INSERT_QUERIES:
+            cursor.execute("""
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, (table,))
+            columns = {row[0] for row in cursor.fetchall()}
+            if 'fingerprint' not in columns:
+                print(f"🔧 {table} tablosuna fingerprint kolonu ekleniyor...")
+                cursor.execute(f"""
+                    ALTER TABLE `{table}`
+                        ADD COLUMN `fingerprint` char(40) DEFAULT NULL,
+                        ADD COLUMN `duplicate_count` int(11) NOT NULL DEFAULT 0,
+                        ADD UNIQUE KEY `uq_fingerprint` (`fingerprint`)
+                """)
+    finally:
+        cursor.close()
+
+
+def row_fingerprint(table, row_id):
+    """Tekrar olarak sayılan eski satırı işaretleyen, başka hiçbir içerikle çakışmayan parmak izi"""
+    return hashlib.sha1(f"{table}\x1frow\x1f{row_id}".encode('utf-8')).hexdigest()
+
+
+def backfill_fingerprints(conn, batch_size=FINGERPRINT_BACKFILL_BATCH):
+    """Parmak izi olmayan satırları id sırasıyla batch'ler halinde doldur; işlenen sayıyı döndür.
+
+    Eski satırların mesaj anahtarı bilinmediğinden kısa içerikte anahtar olarak
+    satır id'si kullanılır (birbirleriyle birleşmezler). İçeriği daha önce görülmüş
+    satırlar ilk satırın duplicate_count'una eklenir ve satıra özel parmak izi alır;
+    böylece her satır bir kez işlenir ve sonraki açılışlarda tekrar sayılmaz.
+    """
+    processed = 0
+    cursor = conn.cursor()
+    try:
+        for table, query in BACKFILL_QUERIES.items():
+            last_id = 0
+            while True:
+                cursor.execute(query, (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                fingerprints = [(row[0], content_fingerprint(table, row[1:], f"row:{row[0]}")) for row in rows]
+                known = set(resolve_ids(cursor, table, list({fp for _, fp in fingerprints}), batch_size))
+
+                updates = []
+                duplicate_rows = []
+                for row_id, fingerprint in fingerprints:
+                    if fingerprint in known:
+                        updates.append((row_fingerprint(table, row_id), row_id))
+                        duplicate_rows.append((fingerprint,))
+                    else:
+                        known.add(fingerprint)
+                        updates.append((fingerprint, row_id))
+
+                conn.start_transaction()
+                try:
+                    cursor.executemany(f"UPDATE `{table}` SET fingerprint = %s WHERE id = %s", updates)
+                    if duplicate_rows:
+                        cursor.executemany(
+                            f"UPDATE `{table}` SET duplicate_count = duplicate_count + 1 WHERE fingerprint = %s",
+                            duplicate_rows
+                        )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                processed += len(rows)
+                print(f"🔧 {table}: id {last_id}'e kadar parmak izi dolduruldu ({len(duplicate_rows)} tekrar)")
+    finally:
+        cursor.close()
+    return processed
+
+
+# Tehdit akışı (dashboard /api/threats) için gerekli index'ler
+SEARCH_INDEXES = {
+    'vulnerabilities': {
+        'ft_title_content': "ADD FULLTEXT KEY `ft_title_content` (`title`, `content`)",
+        'idx_detection_date': "ADD INDEX `idx_detection_date` (`detection_date`, `id`)"
+    }
+}
+
+
+def ensure_search_indexes(conn):
+    """Eksik arama/sıralama index'lerini ekle"""
+    cursor = conn.cursor()
+    try:
+        for table, indexes in SEARCH_INDEXES.items():
+            cursor.execute("""
+                SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, (table,))
+            existing = {row[0] for row in cursor.fetchall()}
+            for name, clause in indexes.items():
+                if name not in existing:
+                    print(f"🔧 {table} tablosuna {name} index'i ekleniyor...")
+                    cursor.execute(f"ALTER TABLE `{table}` {clause}")
+    finally:
+        cursor.close()
+
+
+def warm_bloom(conn, bloom, days):
+    """Son `days` günün satırlarını Bloom filtresine ekle; eklenen sayıyı döndür"""
+    added = 0
+    cursor = conn.cursor()
+    try:
+        for table in INSERT_QUERIES:
+            # Eski satırların parmak izi backfill_fingerprints ile doldurulmuş olmalı
+            cursor.execute(f"""
+                SELECT fingerprint FROM `{table}`
+                WHERE detection_date >= CURDATE() - INTERVAL %s DAY AND fingerprint IS NOT NULL
+            """, (days,))
+            for row in cursor:
+                bloom.add(row[0])
+                added += 1
+    finally:
+        cursor.close()
+    return added
+
+
+def resolve_ids(cursor, table, fingerprints, chunk_size):
+    """Parmak izlerinden satır id'lerini unique index üzerinden bul"""
+    ids = {}
+    for i in range(0, len(fingerprints), chunk_size):
+        chunk = fingerprints[i:i + chunk_size]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cursor.execute(f"SELECT id, fingerprint FROM `{table}` WHERE fingerprint IN ({placeholders})", chunk)
+        ids.update((fingerprint, row_id) for row_id, fingerprint in cursor.fetchall())
+    return ids
+
+
+def write_records(conn, records, bloom, chunk_size):
+    """(tablo, değerler, mesaj anahtarı) kayıtlarını tek transaction'da yaz; (eklenen, tekrar) döndürür.
+
+    Bloom'un 'muhtemelen görüldü' dediği parmak izleri DB'de toplu olarak
+    doğrulanır; kesin tekrarlar eklenmez, yalnızca duplicate_count artırılır.
+    Bloom'un kaçırdıkları (ısıtma penceresi dışı, aynı batch içi) unique index
+    üzerinden ON DUPLICATE KEY ile yakalanır.
+    """
+    by_table = {}
+    for table, values, message_key in records:
+        values = tuple(values)
+        by_table.setdefault(table, []).append(values + (content_fingerprint(table, values, message_key),))
+
+    inserted = 0
+    duplicates = 0
+    new_fingerprints = []
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        for table, rows in by_table.items():
+            candidates = list({row[-1] for row in rows if row[-1] in bloom})
+            known = set()
+            for i in range(0, len(candidates), chunk_size):
+                chunk = candidates[i:i + chunk_size]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"SELECT fingerprint FROM `{table}` WHERE fingerprint IN ({placeholders})", chunk)
+                known.update(row[0] for row in cursor.fetchall())
+
+            duplicate_rows = [(row[-1],) for row in rows if row[-1] in known]
+            if duplicate_rows:
+                cursor.executemany(
+                    f"UPDATE `{table}` SET duplicate_count = duplicate_count + 1 WHERE fingerprint = %s",
+                    duplicate_rows
+                )
+                duplicates += len(duplicate_rows)
+
+            new_rows = [row for row in rows if row[-1] not in known]
+            for i in range(0, len(new_rows), chunk_size):
+                chunk = new_rows[i:i + chunk_size]
+                cursor.executemany(INSERT_QUERIES[table], chunk)
+                # ON DUPLICATE KEY: eklenen satır 1, güncellenen satır 2 sayılır
+                chunk_duplicates = max(0, cursor.rowcount - len(chunk))
+                duplicates += chunk_duplicates
+                inserted += len(chunk) - chunk_duplicates
+            new_fingerprints.extend(row[-1] for row in new_rows)
+
+            # Yeni zafiyetlerin id'leri parmak izinden bulunup CVE/ürün yan tablolarına işlenir
+            if table == 'vulnerabilities' and new_rows:
+                ids = resolve_ids(cursor, table, [row[-1] for row in new_rows], chunk_size)
+                index_advisories(cursor, [
+                    (ids[row[-1]], row[2], row[3]) for row in new_rows if row[-1] in ids
+                ])
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    for fingerprint in new_fingerprints:
+        bloom.add(fingerprint)
+    return inserted, duplicates
@@ -0,0 +1,199 @@
+import os
+import gzip
+import json
+import shutil
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Tampon bu boyutu aşınca hemen diske yazılır
+TRANSCRIPT_FLUSH_BYTES = 64 * 1024
+# Tampon en fazla bu kadar süre bekler (saniye)
+TRANSCRIPT_FLUSH_INTERVAL = 2.0
+
+INDEX_FILENAME = "transcript_index.json"
+
+
+class TranscriptStore:
+    """Kanal başına açık tutulan, tamponlu ve günlük döndürülen transcript dosyaları.
+
+    Segmentler telethon_<kanal>_<YYYY-MM-DD>.txt olarak yazılır, gün ileri
+    gidince kapatılıp arka planda .txt.gz olarak sıkıştırılır; geri doldurmadan
+    gelen eski tarihli satırlar açık segmente yazılır. transcript_index.json her
+    segmentin kanalını, ilk/son mesaj zamanını ve satır sayısını tutar.
+    """
+
+    def __init__(self, directory=".", flush_bytes=TRANSCRIPT_FLUSH_BYTES,
+                 flush_interval=TRANSCRIPT_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.index_path = os.path.join(directory, INDEX_FILENAME)
+        self.index = self._load_index()
+        self.index_dirty = False
+        # kanal -> {"day", "path", "file", "buffer", "buffered_bytes"}
+        self.writers = {}
+        self.compress_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcript-gzip")
+        self.compress_tasks = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+        self.index_dirty = False
+
+    def _segment_name(self, chat_label, day):
+        return f"telethon_{chat_label}_{day}.txt"
+
+    def _open_writer(self, chat_label, day):
+        name = self._segment_name(chat_label, day)
+        writer = {
+            "day": day,
+            "name": name,
+            "file": open(os.path.join(self.directory, name), "a", encoding="utf-8"),
+            "buffer": [],
+            "buffered_bytes": 0
+        }
+        self.writers[chat_label] = writer
+        return writer
+
+    def _flush_writer(self, writer):
+        if writer["buffer"]:
+            writer["file"].write("".join(writer["buffer"]))
+            writer["file"].flush()
+            writer["buffer"] = []
+            writer["buffered_bytes"] = 0
+
+    def write(self, chat_label, timestamp, line):
+        """Satırı kanalın tamponuna ekle; gün ileri gittiyse önce segmenti döndür"""
+        day = timestamp.strftime("%Y-%m-%d")
+        writer = self.writers.get(chat_label)
+        if writer is None:
+            writer = self._open_writer(chat_label, day)
+        elif day > writer["day"]:
+            self._rotate(chat_label, writer)
+            writer = self._open_writer(chat_label, day)
+
+        text = line + "\n"
+        writer["buffer"].append(text)
+        writer["buffered_bytes"] += len(text)
+
+        ts = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        entry = self.index.setdefault(writer["name"], {"channel": chat_label, "first": ts, "last": ts, "lines": 0})
+        entry["first"] = min(entry["first"], ts)
+        entry["last"] = max(entry["last"], ts)
+        entry["lines"] += 1
+        self.index_dirty = True
+
+        if writer["buffered_bytes"] >= self.flush_bytes:
+            self._flush_writer(writer)
+
+    def _rotate(self, chat_label, writer):
+        self._flush_writer(writer)
+        writer["file"].close()
+        del self.writers[chat_label]
+        self._schedule_compress(writer["name"])
+
+    def _schedule_compress(self, name):
+        task = asyncio.get_running_loop().create_task(self._compress(name))
+        self.compress_tasks.add(task)
+        task.add_done_callback(self.compress_tasks.discard)
+
+    async def _compress(self, name):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.compress_executor, compress_file,
+                                       os.path.join(self.directory, name))
+        except OSError as e:
+            print(f"[!] Transcript sıkıştırılamadı ({name}): {e}")
+            return
+
+        entry = self.index.pop(name, None)
+        if entry is not None:
+            # Aynı günün önceki sıkıştırmasına eklendiyse kayıtlar birleştirilir
+            existing = self.index.get(name + ".gz")
+            if existing is not None:
+                entry = {
+                    "channel": entry["channel"],
+                    "first": min(existing["first"], entry["first"]),
+                    "last": max(existing["last"], entry["last"]),
+                    "lines": existing["lines"] + entry["lines"]
+                }
+            self.index[name + ".gz"] = entry
+            self._save_index()
+
+    def compress_stale_segments(self, today):
+        """Önceki çalıştırmalardan sıkıştırılmadan kalmış segmentleri kuyruğa al.
+
+        Açık writer'ı olan segment (ör. geri doldurmanın yazdığı dünkü dosya)
+        atlanır; sıkıştırma sırasında eklenen satırlar kaynakla birlikte silinirdi.
+        O segment writer'ı döndürülünce sıkıştırılır.
+        """
+        open_segments = {writer["name"] for writer in self.writers.values()}
+        for name in os.listdir(self.directory):
+            if (name.startswith("telethon_") and name.endswith(".txt")
+                    and name in self.index and not name.endswith(f"_{today}.txt")
+                    and name not in open_segments):
+                self._schedule_compress(name)
+
+    def flush_all(self):
+        for writer in self.writers.values():
+            self._flush_writer(writer)
+        if self.index_dirty:
+            self._save_index()
+
+    async def run_flusher(self):
+        """Tamponları ve index'i periyodik olarak diske yaz"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush_all()
+            except OSError as e:
+                print(f"[!] Transcript yazılamadı: {e}")
+
+    async def close(self):
+        self.flush_all()
+        for writer in self.writers.values():
+            writer["file"].close()
+        self.writers = {}
+        if self.compress_tasks:
+            await asyncio.gather(*self.compress_tasks, return_exceptions=True)
+        self.compress_executor.shutdown(wait=True)
+
+    def find_segments(self, chat_label=None, start=None, end=None):
+        """Verilen zaman aralığıyla ("YYYY-MM-DD HH:MM:SS") kesişen segmentleri index'ten bul"""
+        result = []
+        for name, entry in sorted(self.index.items()):
+            if chat_label and entry["channel"] != chat_label:
+                continue
+            if start and entry["last"] < start:
+                continue
+            if end and entry["first"] > end:
+                continue
+            result.append(os.path.join(self.directory, name))
+        return result
+
+
+def compress_file(path):
+    """path'i sıkıştırıp path.gz'ye yeni bir gzip üyesi olarak ekle ve orijinali sil.
+
+    Mevcut .gz hiçbir zaman üzerine yazılmaz; aynı gün yeniden açılıp sıkıştırılan
+    segmentler ardışık üyeler olur (gzip okuyucuları hepsini sırayla okur).
+    """
+    tmp_path = path + ".gz.tmp"
+    with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    with open(tmp_path, "rb") as src, open(path + ".gz", "ab") as dst:
+        shutil.copyfileobj(src, dst)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.remove(tmp_path)
+    os.remove(path)